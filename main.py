@@ -5,9 +5,9 @@
 # to unicode. The app converts the Tamil unicode text to
 # a string of glyph data that can be displayed inside
 # Affinity apps. This works only for certain unicode-based open
-# type fonts. The script reads the .ttf file, extracts the cmap and
-# GSUB lookup tables and saves them in a temporary .xml file
-# for use. If the opentype .ttf font file contains all the
+# type fonts. The script reads the .ttf file and extracts the cmap and
+# GSUB lookup tables directly from the font data with fontTools.
+# If the opentype .ttf font file contains all the
 # necessary glyphs for Tamil and if they all are also indexed in
 # GSUB lookup tables, this Python program script will work!
 #
@@ -73,11 +73,16 @@
 #
 
 from tkinter import *
+import os
 import sys
+import pickle
+import re
+import array
+import functools
 import clipboard
+from bisect import bisect_right
 import tkinter.font as font
 from fontTools.ttLib import TTFont
-import xml.etree.ElementTree as ET
 
 # check for available fonts
 # if sys.version_info.major == 3:
@@ -89,12 +94,20 @@ finalDisp = ""  # global final display return value
 uniDisp = ""  # unicode value display for debugging
 
 # enter the language ttf font below!
-# strip and save a temp xml file with only GSUB and cmap tables for the font
+# only the GSUB and cmap tables of the font are read.
 # the conversion is faster, if the font .ttf or .ttc file contains
 # fewer number of glyphs with just one language.
 
-font2 = TTFont("akshar.ttf", fontNumber=0)
-font2.saveXML("temp.xml", tables=["GSUB", "cmap"])
+fontFile = "akshar.ttf"
+fontNumber = 0
+font2 = TTFont(fontFile, fontNumber=fontNumber, lazy=True)  # tables are decompiled when first used
+print(font2.keys())
+
+# check if GSUB is found before reading anything else
+if 'GSUB' not in font2:
+    print("GSUB not found in font file, quitting!")
+    quit()
+print ("GSUB found in the entered font file")
 
 debug = False
 defaultLang1 = False
@@ -110,9 +123,8 @@ swapappends = True  # enable/disable prefix postfix swapping
 doreph = True   # do reph/rakkar processing for Hindi, may not work correctly
 dorakaar = True
 
-# select only one language from below
+# select the language with ACTIVE_LANG below
 # English is bypassed and so will also come
-# do not select two or more, it won't work correctly!
 # I do not know any of the Devanagari languages, but they
 # seem to work mostly, but no guarantees!
 #
@@ -132,634 +144,741 @@ dorakaar = True
 # added crude reph and rakaar sustitution engines. Somewhat works
 # but not fully tested
 
-Tamil = False  # enable only one!
-Deva = True
-
+# per-language data: the feature tags, the unicode char lists for
+# pre-position/pre-base chars, like in கெ கே கை கொ கோ கௌ, and the unicode range.
+# These unicode char lists must be changed for other languages!
+# Please port it for other languages too!
+# Other languages like Hindi or Telugu depend heavily on GPOS rules
+# and may not work correctly in this GSUB based program!
+# langID is the latest form of the script, langID2 the backup name if the first is not found
+# prepChar: single append preposition chars list கெ கே கை
+# prep2Char: double append preposition chars list கொ கோ கௌ
+# preapp2Char: pre-append chars, post2Char: post-append chars
+# postArch: for skipping arch Tamil chars
+LANG_CONFIG = {
+    "Tamil": {
+        "langID": "tml2",  # skip the archaic form taml
+        "langID2": "taml",
+        "prepChar": [0xbc6, 0xbc7, 0xbc8],
+        "prep2Char": [0xbca, 0xbcb, 0xbcc],
+        "preapp2Char": [0xbc6, 0xbc7, 0xbc6],
+        "post2Char": [0xbbe, 0xbbe, 0xbd7],
+        "postArch": [0xbbe],
+        "uniRange": [0x0b80, 0x0bff],  # unicode range for the Tamil language
+    },
+    "Deva": {
+        "langID": "dev2",
+        "langID2": "deva",
+        "prepChar": [0x94e, 0x93f],
+        "prep2Char": [],
+        "preapp2Char": [],
+        "post2Char": [],
+        "postArch": [],
+        "uniRange": [0x0900, 0x097f],  # unicode range for the Hindi language
+        "rephsign": [0x930],  # special reph or ra sign for Hindi only
+        "viramasign": [0x94d],  # virama or halant for Hindi
+        # vowel signs after the consonant that decide where the reph sign goes
+        "rephTopVowels": [0x940, 0x949, 0x94a, 0x94b, 0x94c, 0x94f, 0x93e],  # reph shifted after the vowel
+        "rephPreVowels": [0x93f],  # swapped before the consonant, same as the top ones
+        "rephBottomVowels": [0x941, 0x942, 0x943, 0x944, 0x945, 0x946, 0x947, 0x948, 0x94d],
+    },
+    "Malay": {
+        "langID": "mlm2",
+        "langID2": "mlym",
+        "prepChar": [0xd46, 0xd47, 0xd48],
+        "prep2Char": [0xd4a, 0xd4b, 0xd4c],
+        "preapp2Char": [0xd46, 0xd47, 0xd46],
+        "post2Char": [0xd3e, 0xd3e, 0xd57],
+        "postArch": [],
+        "uniRange": [0x0d00, 0x0d7f],  # unicode range for the Malayalam language
+    },
+    "Telu": {
+        "langID": "tel2",
+        "langID2": "telu",
+        "prepChar": [],
+        "prep2Char": [],
+        "preapp2Char": [],
+        "post2Char": [],
+        "postArch": [],
+        "uniRange": [0x0c00, 0x0c7f],  # unicode range for the Telugu language
+    },
+    "Kann": {
+        "langID": "knd2",
+        "langID2": "knda",
+        "prepChar": [],
+        "prep2Char": [],
+        "preapp2Char": [],
+        "post2Char": [],
+        "postArch": [],
+        "uniRange": [0x0c80, 0x0cff],  # unicode range for the Kannada language
+    },
+}
+
+# select one language from above
 # the following Dravidian languages don't work correctly
 # as they rely mostly on GPOS engine to position char vertically!
 # Malayalam seems to work a bit, except for vertical positioning
 # I do not know these languages!
-Malay = False
-Telu = False
-Kann = False
-
-if Tamil:
-
-    # ------------------------------------------------------
-    # glyph IDs for pre-position/pre-base chars for Tamil, like in கெ கே கை கொ கோ கௌ
-    # This list is for Tamil only!
-    # These unicode char lists must be changed for other languages!
-    # Please port it for other languages too!
-    # Other languages like Hindi or Telugu depend heavily on GPOS rules
-    # and may not work correctly in this GSUB based program!
-
-    langID = "tml2"  # latest form of Tamil, skip the archaic form tml2
-    langID2 = "taml"  # backup name if the first is not found
-    prepChar = ["0xbc6", "0xbc7", "0xbc8"]  # single append preposition chars list கெ கே கை
-    prep2Char = ["0xbca", "0xbcb", "0xbcc"]  # double append preposition chars list கொ கோ கௌ
-    preapp2Char = ["0xbc6", "0xbc7", "0xbc6"]  # pre-append chars
-    post2Char = ["0xbbe", "0xbbe", "0xbd7"]  # post-append chars
-    postArch = ["0xbbe"]  # for skipping arch Tamil chars
-    prepglyID = [0, 0, 0]  # pre-position glyph ID list initialization
-    prep2glyID = [0, 0, 0]  # second pre-position glyph ID list initialization
-    preapp2glyID = [0, 0, 0]  # pre-append glyph ID list initialization
-    post2glyID = [0, 0, 0]  # post-append glyph ID list initialization
-    uniRange = [0x0b80, 0x0bff]  # unicode range for the Tamil language
-    # -----------------------------------------------------
-
+ACTIVE_LANG = "Deva"
+
+Tamil = ACTIVE_LANG == "Tamil"
+Deva = ACTIVE_LANG == "Deva"
+Malay = ACTIVE_LANG == "Malay"
+Telu = ACTIVE_LANG == "Telu"
+Kann = ACTIVE_LANG == "Kann"
+
+langConfig = LANG_CONFIG[ACTIVE_LANG]
+langID = langConfig["langID"]
+langID2 = langConfig["langID2"]
+prepChar = langConfig["prepChar"]
+prep2Char = langConfig["prep2Char"]
+preapp2Char = langConfig["preapp2Char"]
+post2Char = langConfig["post2Char"]
+postArch = langConfig["postArch"]
+uniRange = langConfig["uniRange"]
 if Deva:
+    rephsign = langConfig["rephsign"]
+    viramasign = langConfig["viramasign"]
+    rephTopVowels = langConfig["rephTopVowels"]
+    rephPreVowels = langConfig["rephPreVowels"]
+    rephBottomVowels = langConfig["rephBottomVowels"]
+
+# glyph IDs for the pre-position and post-position chars, filled in from the cmap
+# kept as C int arrays, they are only read by index in the swap loops
+prepglyID = array.array('i', [0] * len(prepChar))  # pre-position glyph ID list initialization
+prep2glyID = array.array('i', [0] * len(prep2Char))  # second pre-position glyph ID list initialization
+preapp2glyID = array.array('i', [0] * len(preapp2Char))  # pre-append glyph ID list initialization
+post2glyID = array.array('i', [0] * len(post2Char))  # post-append glyph ID list initialization
+
+
+# a word is worked on as a list of integer glyph IDs; the special chars get
+# negative IDs of their own, so they never match a glyph of the font
+noGlyph = -1  # the padding at the end of a word and chars that are not in the cmap
+LFMark = -2
+CRMark = -3
+SpaceMark = -4
+ZWNJMark = -5
+ZWJMark = -6
+LineBreakMark = -7
+ParaSeparatorMark = -8
+absentGlyph = -9  # cmapid() of a char the font has no glyph for
+
+# glyph IDs by glyph name, built once instead of asking fontTools for every name
+glyphIDs = {glyphName: glyphID for glyphID, glyphName in enumerate(font2.getGlyphOrder())}
+# names that are not in the glyph order, like glyph65535 or the joined glyphs of a
+# type 2 lookup, get IDs past its end, so they only match their own name
+extraGlyphIDs = {}
+
+
+def glyphid(name):
+    # integer glyph ID for a glyph name from the GSUB or cmap tables
+    if name is None:
+        return noGlyph
+    glyphID = glyphIDs.get(name)  # one probe for the usual case of a name in the glyph order
+    if glyphID is not None:
+        return glyphID
+    if name not in extraGlyphIDs:
+        extraGlyphIDs[name] = len(glyphIDs) + len(extraGlyphIDs)
+    return extraGlyphIDs[name]
+
+
+def subtables(lookup):
+    # extension lookups (type 7) wrap the real subtables
+    if lookup.LookupType == 7:
+        return [st.ExtSubTable for st in lookup.SubTable]
+    return lookup.SubTable
+
+
+def lookuptype(lookup):
+    # extension lookups (type 7) carry the real type in their subtables
+    if lookup.LookupType == 7 and lookup.SubTable:
+        return lookup.SubTable[0].ExtensionLookupType
+    return lookup.LookupType
+
+
+def headindex(table, head):
+    # entry numbers of a table for each glyph in its column head, in table order
+    index = {}
+    for i3, row in enumerate(table):
+        index.setdefault(row[head], []).append(i3)
+    return index
+
+
+def substitutions(lookup):
+    # (in, out) glyph IDs of a type 1 (or type 2) lookup in glyph name order
+    substs = []
+    for st in subtables(lookup):
+        for inglyph, outglyph in sorted(getattr(st, 'mapping', {}).items()):
+            if not isinstance(outglyph, str):  # type 2 has a list of glyphs
+                outglyph = ",".join(outglyph)
+            substs.append((glyphid(inglyph), glyphid(outglyph)))
+    return substs
+
+
+def readtables():
+    # the GSUB tables the main loop uses, read from the font data, by name
+    gsub = font2["GSUB"].table
+    # lookup tables by their index, so we do not rescan the lookup list for every index
+    lookupByIndex = {str(i): c for i, c in enumerate(gsub.LookupList.Lookup)}
+
+    # read other link and subst data from the font file
+    # each table entry is a tuple; the fields are only read, by position
+    # glyphs are stored by their glyph ID, see glyphid()
+    substList = []  # final type 4 substitution data
+    subst1List = []  # final type 1 LA substitution data
+    subst1BTList = []  # final type 1 BT substitution data
+    subst6List = []  # final type 6 LA substitution data
+    subst6BTList = []  # final type 6 BT substitution data
+    subst5List = []  # final type 5 substitution data
+    subst5DefList = []  # type 5 classdef list
+    subst5RuleList = []  # type 5 rule list
+
+    # first get feature list
+    featByTag = {}  # feature indices in GSUB for each script tag
+    for c in gsub.ScriptList.ScriptRecord:
+        scripttag = c.ScriptTag
+        langsys = [c.Script.DefaultLangSys] + [d.LangSys for d in c.Script.LangSysRecord]
+        for d in langsys:
+            if d is None:
+                continue
+            for featvalue in d.FeatureIndex:
+                featByTag.setdefault(scripttag, []).append(str(featvalue))
+    #print(featByTag)
 
-    # ------------------------------------------------------
-    # glyph IDs for pre-position/pre-base chars for Tamil, like in கெ கே கை கொ கோ கௌ
-    # This list is for Deva only!
-    # These unicode char lists must be changed for other languages!
-    # Please port it for other languages too!
-    # Other languages like Hindi or Telugu depend heavily on GPOS rules
-    # and may not work correctly in this GSUB based program!
-
-    langID = "dev2"  # latest form of Tamil, skip the archaic form tml2
-    langID2 = "deva"  # backup name if the first is not found
-    prepChar = ["0x94e", "0x93f"]  # single append preposition chars list கெ கே கை
-    prep2Char = []  # double append preposition chars list கொ கோ கௌ
-    preapp2Char = []  # pre-append chars
-    post2Char = []  # post-append chars
-    postArch = []  # for skipping arch Tamil chars
-    prepglyID = [0, 0]  # pre-position glyph ID list initialization
-    prep2glyID = []  # second pre-position glyph ID list initialization
-    preapp2glyID = []  # pre-append glyph ID list initialization
-    post2glyID = []  # post-append glyph ID list initialization
-    uniRange = [0x0900, 0x097f]  # unicode range for the Hindi language
-    rephsign = ["0x930"]  # special reph or ra sign for Hindi only
-    viramasign = ["0x94d"] # virama or halant for Hindi
-    # -----------------------------------------------------
-
-if Malay:
-
-    # ------------------------------------------------------
-    # glyph IDs for pre-position/pre-base chars for Malayalam, like in கெ கே கை கொ கோ கௌ
-    # This list is for Malay only!
-    # These unicode char lists must be changed for other languages!
-    # Please port it for other languages too!
-    # Other languages like Hindi or Telugu depend heavily on GPOS rules
-    # and may not work correctly in this GSUB based program!
-
-    langID = "mlm2"  # latest form of Tamil, skip the archaic form tml2
-    langID2 = "mlym"  # backup name if the first is not found
-    prepChar = ["0xd46", "0xd47", "0xd48"]  # single append preposition chars list கெ கே கை
-    prep2Char = ["0xd4a", "0xd4b", "0xd4c"]  # double append preposition chars list கொ கோ கௌ
-    preapp2Char = ["0xd46", "0xd47", "0xd46"]  # pre-append chars
-    post2Char = ["0xd3e", "0xd3e", "0xd57"]  # post-append chars
-    prepglyID = [0, 0, 0]  # pre-position glyph ID list initialization
-    prep2glyID = [0, 0, 0]  # second pre-position glyph ID list initialization
-    preapp2glyID = [0, 0, 0]  # pre-append glyph ID list initialization
-    post2glyID = [0, 0, 0]  # post-append glyph ID list initialization
-    uniRange = [0x0d00, 0x0d7f]  # unicode range for the Malayalam language
-    # -----------------------------------------------------
-
-if Telu:
-
-    # ------------------------------------------------------
-    # glyph IDs for pre-position/pre-base chars for Telugu, like in கெ கே கை கொ கோ கௌ
-    # This list is for Telugu only!
-    # These unicode char lists must be changed for other languages!
-    # Please port it for other languages too!
-    # Other languages like Hindi or Telugu depend heavily on GPOS rules
-    # and may not work correctly in this GSUB based program!
-
-    langID = "tel2"  # latest form of Tamil, skip the archaic form tml2
-    langID2 = "telu"  # backup name if the first is not found
-    prepChar = []  # single append preposition chars list கெ கே கை
-    prep2Char = []  # double append preposition chars list கொ கோ கௌ
-    preapp2Char = []  # pre-append chars
-    post2Char = []  # post-append chars
-    prepglyID = []  # pre-position glyph ID list initialization
-    prep2glyID = []  # second pre-position glyph ID list initialization
-    preapp2glyID = []  # pre-append glyph ID list initialization
-    post2glyID = []  # post-append glyph ID list initialization
-    uniRange = [0x0c00, 0x0c7f]  # unicode range for the Malayalam language
-    # -----------------------------------------------------
-
-if Kann:
-
-    # ------------------------------------------------------
-    # glyph IDs for pre-position/pre-base chars for Kannada, like in கெ கே கை கொ கோ கௌ
-    # This list is for Telugu only!
-    # These unicode char lists must be changed for other languages!
-    # Please port it for other languages too!
-    # Other languages like Hindi or Telugu depend heavily on GPOS rules
-    # and may not work correctly in this GSUB based program!
-
-    langID = "knd2"  # latest form of Tamil, skip the archaic form tml2
-    langID2 = "knda"  # backup name if the first is not found
-    prepChar = []  # single append preposition chars list கெ கே கை
-    prep2Char = []  # double append preposition chars list கொ கோ கௌ
-    preapp2Char = []  # pre-append chars
-    post2Char = []  # post-append chars
-    prepglyID = []  # pre-position glyph ID list initialization
-    prep2glyID = []  # second pre-position glyph ID list initialization
-    preapp2glyID = []  # pre-append glyph ID list initialization
-    post2glyID = []  # post-append glyph ID list initialization
-    uniRange = [0x0c80, 0x0cff]  # unicode range for the Malayalam language
-    # -----------------------------------------------------
+    lookupsByFeature = {}  # (feature tag, lookup index) pairs for each feature record index
+    for featurerecordindex, c in enumerate(gsub.FeatureList.FeatureRecord):
+        featuretag = c.FeatureTag
+        for lookuplistval in c.Feature.LookupListIndex:
+            lookupsByFeature.setdefault(str(featurerecordindex), []).append((featuretag, str(lookuplistval)))
+    #print("lookupsByFeature = ", lookupsByFeature)
 
-print(font2.keys())
+    # check which version of tml2 or taml is present
+    defaultLang1 = langID in featByTag  # check first if tml2 is found
+    defaultLang2 = langID2 in featByTag  # check next if taml is found
 
-# check if GSUB is found
-GSUBfound = False
-for c in font2.keys():
-    if c == 'GSUB':
-        print ("GSUB found in the entered font file")
-        GSUBfound = True
+    # print(defaultLang1, defaultLang2)
 
-if not GSUBfound:
-    print("GSUB not found in font file, quitting!")
-    quit()
+    lkList = []  # linked list
 
-# parse xml tree. this xml is created in the same main directory
-tree = ET.parse('temp.xml')
-
-# getting the parent tag of
-# the xml document
-root = tree.getroot()
-
-# read other link and subst data from the xml font file
-substList = []  # final type 4 substitution data
-subst1List = []  # final type 1 LA substitution data
-subst1BTList = []  # final type 1 BT substitution data
-subst6List = []  # final type 6 LA substitution data
-subst6BTList = []  # final type 6 BT substitution data
-subst5List = []  # final type 5 substitution data
-subst5DefList = []  # type 5 classdef list
-subst5RuleList = []  # type 5 rule list
-
-# first get feature list
-featlist = []  # list of features in GSUB
-for c in root.iter('ScriptRecord'):
-    scriptrecord = c.get("index")
-    for d in c.iter('ScriptTag'):
-        scripttag = d.get("value")
-        for e in c.iter('FeatureIndex'):
-            featindex = e.get("index")
-            featvalue = e.get("value")
-            featlist.append([scriptrecord, scripttag, featindex, featvalue])
-#print(featlist)
-
-lookuplist = []  # list of lookup indices
-for c in root.iter('FeatureRecord'):
-    featurerecordindex = c.get("index")
-    for d in c.iter('FeatureTag'):
-        featuretag = d.get("value")
-        for e in c.iter('LookupListIndex'):
-            lookuplistindex = e.get("index")
-            lookuplistval = e.get("value")
-            lookuplist.append([featurerecordindex, featuretag, lookuplistindex, lookuplistval])
-#print("lookuplist = ", lookuplist)
-
-# check which version of tml2 or taml is present
-# search whole list first
-for j in range(0, len(featlist)):
-    if langID == featlist[j][1]:  # check first if tml2 is found
-        defaultLang1 = True
-    if langID2 == featlist[j][1]:  # check next if taml is found
-        defaultLang2 = True
-
-# print(defaultLang1, defaultLang2)
-
-lkList = []  # linked list
-
-if defaultLang1:
-    # print("got the 1st language")
-    for j in range(0, len(featlist)):
-        if langID == featlist[j][1]:  # check first if tml2 is found
-            lkList.append(featlist[j][3])
-            print("default language found =", langID)
-
-elif defaultLang2:
-    # print("got to 2nd language")
-    for j in range(0, len(featlist)):
-        if langID2 == featlist[j][1]:  # check if the other archaic form taml is found
-                lkList.append(featlist[j][3])
-                print("language found is old version", langID2)
-
-print("Feature table index: lkList =", lkList)
-
-# now get link list of lookup tables to use in correct order
-llList = []
-if Deva:
+    if defaultLang1:
+        # print("got the 1st language")
+        lkList = featByTag[langID]
+        print("default language found =", langID)
+
+    elif defaultLang2:
+        # print("got to 2nd language")
+        lkList = featByTag[langID2]  # the other archaic form taml
+        print("language found is old version", langID2)
+
+    print("Feature table index: lkList =", lkList)
+
+    # now get link list of lookup tables to use in correct order
+    llList = []
+    # reph and rakaar tables are only looked for in Deva, and only when switched on
     rephList = []
     rakaarList = []
     enablereph = False
     enablerakaar = False
-for k in range(0, len(lkList)):
-    for j in range(0, len(lookuplist)):
-        if (lookuplist[j][0]) == lkList[k]:
-            llList.append(lookuplist[j][3])
-            if Deva:
-                if "rphf" == lookuplist[j][1]:  # check rphf
-                    rephList.append(lookuplist[j][3])
-                    enablereph = True
-                    print("reph feature found in table = " , lookuplist[j][3], " and enabled")
-                if "rkrf" == lookuplist[j][1]:  # check rkrf
-                    rakaarList.append(lookuplist[j][3])
-                    enablerakaar = True
-                    print("rakaar feature found in table = " , lookuplist[j][3], "and enabled")
-
-print("Lookup table index: llList =", llList)
-if Deva:
-    print("reph table index: rephList =", rephList, "and reph enable = ", enablereph)
-    print("rakaar table index: rakaarList =", rakaarList, "and rakaar enable =", enablerakaar)
-
-# get reph substitution table here
-if Deva and enablereph and doreph:
-    j =0
     rephlookupList = []
-    for k in range(0, len(rephList)):
-        for c in root.iter('Lookup'):
-            rephindex = c.get('index')
-            if rephList[k] == rephindex:  # check in right order
-                for d in c.iter('LigatureSet'):  # effectively search on for type 4 subst
-                    forrephglyph = (d.get('glyph'))  # for this glyph, with glyph ID
-                    for e in d.iter('Ligature'):
-                        #rephcomp = str(e.get('components')).split(",")  # next component, split if there is more than 1
-                        rephcomp = e.get('components')
+    rakaarlookupList = []
+    for k in lkList:
+        for featuretag, lookupindex in lookupsByFeature.get(k, []):
+            llList.append(lookupindex)
+            if Deva and doreph and "rphf" == featuretag:  # check rphf
+                rephList.append(lookupindex)
+                enablereph = True
+                print("reph feature found in table = " , lookupindex, " and enabled")
+            if Deva and dorakaar and "rkrf" == featuretag:  # check rkrf
+                rakaarList.append(lookupindex)
+                enablerakaar = True
+                print("rakaar feature found in table = " , lookupindex, "and enabled")
+
+    print("Lookup table index: llList =", llList)
+
+    # split llList by lookup type, keeping the order, so that each table
+    # below only walks the lookups of its own type
+    llListByType = {}
+    for k in llList:
+        llListByType.setdefault(lookuptype(lookupByIndex[k]), []).append(k)
+    if Deva:
+        print("reph table index: rephList =", rephList, "and reph enable = ", enablereph)
+        print("rakaar table index: rakaarList =", rakaarList, "and rakaar enable =", enablerakaar)
+
+    # get reph substitution table here
+    if enablereph:
+        j =0
+        for rephindex in rephList:  # in right order
+            c = lookupByIndex[rephindex]
+            for st in subtables(c):
+                for forrephglyph, d in sorted(getattr(st, 'ligatures', {}).items()):  # type 4 subst
+                    for e in d:  # for this glyph, with glyph ID
+                        rephcomp = tuple(map(glyphid, e.Component))
                         # assume only one component now!
-                        rephglyph = (e.get('glyph'))
-                        rephlookupList.append([(forrephglyph),
-                                          (rephcomp),(rephglyph)])
+                        rephglyph = glyphid(e.LigGlyph)
+                        rephlookupList.append((glyphid(forrephglyph), rephcomp, rephglyph))
 
                         j = j + 1
-                continue  # get substitute list in correct order
 
-    print("number of reph substitutions =", j)
-    #print("rephlookupList = ", rephlookupList)
-
-# get rakaar substitution table here
-if Deva and enablerakaar and dorakaar:
-    j =0
-    rakaarlookupList = []
-    for k in range(0, len(rakaarList)):
-        for c in root.iter('Lookup'):
-            rakaarindex = c.get('index')
-            if rakaarList[k] == rakaarindex:  # check in right order
-                for d in c.iter('LigatureSet'):  # effectively search on for type 4 subst
-                    forrakaarglyph = (d.get('glyph'))  # for this glyph, with glyph ID
-                    for e in d.iter('Ligature'):
-                        rakaarcomp = str(e.get('components')).split(",")  # next component, split if there is more than 1
+        print("number of reph substitutions =", j)
+        #print("rephlookupList = ", rephlookupList)
+
+    # get rakaar substitution table here
+    if enablerakaar:
+        j =0
+        for rakaarindex in rakaarList:  # in right order
+            c = lookupByIndex[rakaarindex]
+            for st in subtables(c):
+                for forrakaarglyph, d in sorted(getattr(st, 'ligatures', {}).items()):  # type 4 subst
+                    for e in d:  # for this glyph, with glyph ID
+                        rakaarcomp = tuple(map(glyphid, e.Component))  # next components
                         # rakaar has two components
-                        rakaarglyph = (e.get('glyph'))
-                        rakaarlookupList.append([(forrakaarglyph),
-                                          (rakaarcomp),(rakaarglyph)])
+                        rakaarglyph = glyphid(e.LigGlyph)
+                        rakaarlookupList.append((glyphid(forrakaarglyph), rakaarcomp, rakaarglyph))
 
                         j = j + 1
-                continue  # get substitute list in correct order
-
-    print("number of rakaar substitutions =", j)
-    #print("rakaarlookupList = ", rakaarlookupList)
-
-# get char substitution type 4 list here
-j = 0
-
-for k in range(0, len(llList)):
-    for c in root.iter('Lookup'):
-        subsetindex = c.get('index')
-        if llList[k] == subsetindex:  # check in right order
-            for d in c.iter('LigatureSet'):  # effectively search on for type 4 subst
-                forglyph = (d.get('glyph'))  # for this glyph, with glyph ID
-                for e in d.iter('Ligature'):
-                    substcomp = str(e.get('components')).split(",")  # next component, split if there is more than 1
-                    # for k in range(0, len(substcomp)):
-                    #     substcomp[k] = (substcomp[k])
-                    substglyph = (e.get('glyph'))
-                    substList.append([(forglyph),
-                                      (substcomp),(substglyph)])
+
+        print("number of rakaar substitutions =", j)
+        #print("rakaarlookupList = ", rakaarlookupList)
+    rakaarIndex = headindex(rakaarlookupList, 0)
+
+    # get char substitution type 4 list here
+    j = 0
+
+    for subsetindex in llListByType.get(4, []):  # in right order
+        c = lookupByIndex[subsetindex]
+        for st in subtables(c):
+            for forglyph, d in sorted(getattr(st, 'ligatures', {}).items()):  # type 4 subst
+                for e in d:  # for this glyph, with glyph ID
+                    substcomp = tuple(map(glyphid, e.Component))  # next components, there may be more than 1
+                    substglyph = glyphid(e.LigGlyph)
+                    substList.append((glyphid(forglyph), substcomp, substglyph))
                     # if debug:
                     #     if (forglyph == 'uni0940'):  # for debugging a particular char
                     #         print("forglyph name= ", [(forglyph),
                     #                       (substcomp),(substglyph)])
 
                     j = j + 1
-            continue  # get substitute list in correct order
-
-print("number of substitutions type 4 =", j)
 
-if debug:
-    print(substList)
-
-# get char substitution type 5 lists here
-j = 0
-jj = 0
-jjj = 0
-
-for k in range(0, len(llList)):
-    for c in root.iter('Lookup'):
-        subset5index = c.get('index')
-        if llList[k] == subset5index:  # check in right order
-            for d in c.iter('LookupType'):  # effectively search for type 6 subst
-                type5 = d.get('value')
-                if not type5 == "5":
-                    break  # break this d loop and go to next table
-                print("found lookup table type 5 in the table number",subset5index, "and the type is" , type5)
-                for e in c.iter('Glyph'):
-                    glyphvalue = e.get('value')
-                    subst5List.append([subset5index, glyphvalue])
+    print("number of substitutions type 4 =", j)
+
+    # type 4 entries in a trie over the glyph sequence, the for glyph and its 1, 2 or
+    # 3 components; a node is (entries ending here, next glyph -> node). The 3 component
+    # ones are also keyed by (for glyph, 1st, 3rd component) for the ZWNJ rule; the
+    # entries are entry numbers in substList, in table order
+    substIndex = headindex(substList, 0)
+    ligatureTrie = {}
+    zwnjLigatureMap = {}
+    for i3, (forglyph, substcomp, substglyph) in enumerate(substList):
+        if 1 <= len(substcomp) <= 3:
+            node = ligatureTrie.setdefault(forglyph, ([], {}))
+            for g in substcomp:
+                node = node[1].setdefault(g, ([], {}))
+            node[0].append(i3)
+        if len(substcomp) == 3:
+            zwnjLigatureMap.setdefault((forglyph, substcomp[0], substcomp[2]), []).append(i3)
+
+    if debug:
+        print(substList)
+
+    # get char substitution type 5 lists here
+    j = 0
+    jj = 0
+    jjj = 0
+
+    for subset5index in llListByType.get(5, []):  # in right order
+        c = lookupByIndex[subset5index]
+        print("found lookup table type 5 in the table number",subset5index, "and the type is" , lookuptype(c))
+        for st in subtables(c):
+            coverage = getattr(st, 'Coverage', [])
+            if not isinstance(coverage, list):  # format 3 has a list of coverages
+                coverage = [coverage]
+            for d in coverage:
+                for glyphvalue in d.glyphs:
+                    subst5List.append((subset5index, glyphid(glyphvalue)))
                     j = j + 1
 
-                for e in c.iter('ClassDef'):
-                    glyphDefvalue = e.get('glyph')
-                    glyphDefclass = e.get('class')
-                    #print(glyphvalue, glyphclass)
-                    subst5DefList.append([subset5index, glyphDefvalue, glyphDefclass])
-                    jj = jj + 1
-
-                for e in c.iter('SubClassSet'):
-                    classindex = e.get('index')
-                    isempty = e.get('empty')
-                    if isempty == "1":
-                        nextglyphclass = None
-                        lookupruleindex = "0"
-                        classrulenumber = "0"
+        for st in subtables(c):
+            if getattr(st, 'ClassDef', None) is None:
+                continue
+            for glyphDefvalue, glyphDefclass in sorted(st.ClassDef.classDefs.items()):
+                #print(glyphvalue, glyphclass)
+                subst5DefList.append((subset5index, glyphid(glyphDefvalue), str(glyphDefclass)))
+                jj = jj + 1
+
+        for st in subtables(c):
+            for classindex, e in enumerate(getattr(st, 'SubClassSet', [])):
+                classindex = str(classindex)
+                if e is None:  # empty class set
+                    nextglyphclass = None
+                    lookupruleindex = "0"
+                    classrulenumber = "0"
+                    jjj = jjj + 1
+                    subst5RuleList.append((subset5index, classindex, classrulenumber, nextglyphclass, lookupruleindex))
+                    continue
+                for classrulenumber, f in enumerate(e.SubClassRule):
+                    classrulenumber = str(classrulenumber)
+                    for g in f.Class:
+                        nextglyphclass = str(g)
+                    for g in f.SubstLookupRecord:
+                        lookupruleindex = str(g.LookupListIndex)
+                        subst5RuleList.append((subset5index, classindex, classrulenumber, nextglyphclass, lookupruleindex))
                         jjj = jjj + 1
-                        subst5RuleList.append([subset5index, classindex, classrulenumber, nextglyphclass, lookupruleindex])
-                        continue
-                    for f in e.iter('SubClassRule'):
-                        classrulenumber = f.get('index')
-                        for g in f.iter('Class'):
-                            nextglyphclass = g.get('value')
-                        for g in f.iter('LookupListIndex'):
-                            lookupruleindex = g.get('value')
-                            subst5RuleList.append([subset5index, classindex, classrulenumber, nextglyphclass, lookupruleindex])
-                            jjj = jjj + 1
-
-print("number of substitutions type 5 =", j)
-#print("susbt5List (table, glyph)=", subst5List)
-print("number of type 5 classdef =", jj)
-#print("subst5DefList (table, glyph, class) =", subst5DefList)
-print("number of type 5 lookup rules =", jjj)
-#print("subst5RuleList (table, class, rule number, next glyph class, lookup table) =", subst5RuleList)
-
-# now get type 1 subst lookup list from type 5 rules
-# create empty array
-subst5lookup1List = []
-for k in range(0, len(subst5RuleList)):
-    subst5lookup1List.append([None, None, None, None, None, None])
-
-j = 0
-for k in range(0, len(subst5RuleList)):
-    subst5lookup1List[k] = [subst5RuleList[k][0], subst5RuleList[k][4], None, None,
-                            subst5RuleList[k][1], subst5RuleList[k][2]]
-    for c in root.iter('Lookup'):
-        subst5lookup1Listindex = c.get('index')
-        #print("got here1")
-        if subst5RuleList[k][4] == subst5lookup1Listindex:  # check in right order & assume it is type 1 table
-            #print("got here2")
-            for d in c.iter('Substitution'):  # effectively search for type 6 subst
-                subst1in = d.get('in')
-                subst1out = d.get('out')
-                #print("glyphID substs", subst5RuleList[k][0], subst5lookup1Listindex, hex(font2.getGlyphID(subst1in)), hex(font2.getGlyphID(subst1out)))
-                subst5lookup1List[k][2] = subst1in
-                subst5lookup1List[k][3] = subst1out
-                j = j + 1
-
-print("number of type 5 referred type 1 substitutions =", j)
-#print("subst5lookup1List (type 5 table, type 1 table, subst1in, susbt1out, class no., rule no.) =", subst5lookup1List)
-
-# get char substitution type 6 LA list here, easier to work with glyph ID, so get glyph ID
-j = 0
-
-for k in range(0, len(llList)):
-    for c in root.iter('Lookup'):
-        subset6index = c.get('index')
-        if llList[k] == subset6index:  # check in right order
-            for d in c.iter('InputCoverage'):  # effectively search for type 6 subst
-                index1 = d.get('index')
-            for d in c.iter('SubstLookupRecord'):
-                index2 = d.get('index')
-            for d in c.iter('LookAheadCoverage'):
-                index3 = d.get('index')
-
-            temp1 = []
-            for d in c.iter('InputCoverage'):  # effectively search on for type 4 subst
-                for e in d.iter('Glyph'):  # effectively search on for type 4 subst
-                    inputglyph = e.get('value')  # for in glyph
-                    temp1.append(inputglyph)
-
-            temp2 = ""
-            for d in c.iter('SubstLookupRecord'):
-                for e in d.iter('LookupListIndex'):
-                    looklistindex = e.get('value')
-                    temp2 = temp2+ looklistindex   # there only one value for the final look up table
-
-            temp3 = []
-            for d in c.iter('LookAheadCoverage'):
-                for e in d.iter('Glyph'):
-                    lookaheadglyph = e.get('value')
-                    temp3.append(lookaheadglyph)
-
-                subst6List.append([index1, index3, index2, temp1, temp3,temp2])
-                #print([temp1, temp3, temp2])
-                j = j + 1
-
-           # if debug:
-            #         if (inputglyph == 'uni093F'):  # for debugging a particular char
-            #             print("inglyph name= ", [inputglyph, temp, looklistindex])
-
-            continue  # get substitute list in correct order
-
-print("number of LA substitutions type 6 =", j)
-#print((subst6List))
 
-if debug:
-    print(subst6List)
-
-# get char substitution type 6 BT list here, easier to work with glyph ID, so get glyph ID
-j = 0
-
-for k in range(0, len(llList)):
-    for c in root.iter('Lookup'):
-        subset6BTindex = c.get('index')
-        if llList[k] == subset6BTindex:  # check in right order
-            for d in c.iter('InputCoverage'):  # effectively search on for type 4 subst
-                indexBT1 = d.get('index')
-            for d in c.iter('SubstLookupRecord'):
-                indexBT2 = d.get('index')
-            for d in c.iter('BacktrackCoverage'):
-                indexBT3 = d.get('index')
-
-            tempBT1 = []
-            for d in c.iter('InputCoverage'):
-                for e in d.iter('Glyph'):  # effectively search on for type 4 subst
-                    inputglyph = (e.get('value'))  # for in glyph
-                    tempBT1.append(inputglyph)
-
-            tempBT2 = ""
-            for d in c.iter('SubstLookupRecord'):
-                for e in d.iter('LookupListIndex'):
-                    looklistBTindex = e.get('value')
-                    tempBT2 = tempBT2 + looklistBTindex
-
-            tempBT3 = []
-            for d in c.iter('BacktrackCoverage'):
-                for e in d.iter('Glyph'):
-                    backtrackglyph = (e.get('value'))
-                    tempBT3.append(backtrackglyph)
-
-                subst6BTList.append([indexBT1, indexBT3, indexBT2, tempBT1, tempBT3, tempBT2])
-                j = j + 1
-
-            # if debug:
-            #         if (inputglyph == 'uni093F'):  # for debugging a particular char
-            #             print("inglyph name= ", [inputglyph, temp, looklistindex])
-            #     #
-
-            continue  # get substitute list in correct order
-
-print("number of BT substitutions type 6 =", j)
-#print((subst6BTList))
+    print("number of substitutions type 5 =", j)
+    subst5Index = headindex(subst5List, 1)
+    #print("susbt5List (table, glyph)=", subst5List)
+    print("number of type 5 classdef =", jj)
+    #print("subst5DefList (table, glyph, class) =", subst5DefList)
+    print("number of type 5 lookup rules =", jjj)
+    #print("subst5RuleList (table, class, rule number, next glyph class, lookup table) =", subst5RuleList)
+
+    # now get type 1 subst lookup list from type 5 rules
+    # one entry per rule, built directly; only the last substitution of the
+    # referred type 1 table is kept in the subst1in/subst1out slots
+    subst5lookup1List = []
+    j = 0
+    for rule in subst5RuleList:
+        subst1in = noGlyph
+        subst1out = noGlyph
+        c = lookupByIndex[rule[4]]  # assume it is type 1 table
+        for subst1in, subst1out in substitutions(c):
+            #print("glyphID substs", rule[0], rule[4], hex(subst1in), hex(subst1out))
+            j = j + 1
+        subst5lookup1List.append((rule[0], rule[4], subst1in, subst1out, rule[1], rule[2]))
+
+    print("number of type 5 referred type 1 substitutions =", j)
+    #print("subst5lookup1List (type 5 table, type 1 table, subst1in, susbt1out, class no., rule no.) =", subst5lookup1List)
+
+    # index the type 5 lists by the keys the main loop matches on, keeping
+    # table order inside each key so repeated entries still apply in turn
+    subst5ClassMap = {}  # (table, glyph) -> classes
+    for entry in subst5DefList:
+        subst5ClassMap.setdefault((entry[0], entry[1]), []).append(entry[2])
+    subst5RuleMap = {}  # (table, class) -> (lookup, rule number)
+    for rule in subst5RuleList:
+        subst5RuleMap.setdefault((rule[0], rule[1]), []).append((rule[4], rule[2]))
+    subst5SubstMap = {}  # (table, lookup, class, rule number) -> (subst1in, subst1out)
+    for entry in subst5lookup1List:
+        subst5SubstMap.setdefault((entry[0], entry[1], entry[4], entry[5]), []).append((entry[2], entry[3]))
+
+    # get char substitution type 6 LA and BT lists here, easier to work with glyph ID, so get glyph ID
+    # each chaining lookup is read once for both lists
+    j = 0
+    jBT = 0
+
+    for subset6index in llListByType.get(6, []):  # in right order
+        c = lookupByIndex[subset6index]
+        temp1 = []  # input glyphs
+        temp2 = ""  # lookup table indices
+        temp3 = []  # lookahead glyphs
+        tempBT3 = []  # backtrack glyphs
+        lookahead = False
+        backtrack = False
+        for st in subtables(c):  # effectively search for type 6 subst
+            for index1, d in enumerate(getattr(st, 'InputCoverage', [])):
+                temp1.extend(map(glyphid, d.glyphs))  # for in glyph
+            for index2, d in enumerate(getattr(st, 'SubstLookupRecord', [])):
+                looklistindex = str(d.LookupListIndex)
+                temp2 = temp2+ looklistindex   # there only one value for the final look up table
+            for index3, d in enumerate(getattr(st, 'LookAheadCoverage', [])):
+                temp3.extend(map(glyphid, d.glyphs))
+                lookahead = True
+            for indexBT3, d in enumerate(getattr(st, 'BacktrackCoverage', [])):
+                tempBT3.extend(map(glyphid, d.glyphs))
+                backtrack = True
+
+        if lookahead:
+            subst6List.append((str(index1), str(index3), str(index2), tuple(temp1), tuple(temp3), temp2))
+            #print([temp1, temp3, temp2])
+            j = j + 1
+
+        if backtrack:
+            subst6BTList.append((str(index1), str(indexBT3), str(index2), tuple(temp1), tuple(tempBT3), temp2))
+            jBT = jBT + 1
+
+        # if debug:
+        #         if (inputglyph == 'uni093F'):  # for debugging a particular char
+        #             print("inglyph name= ", [inputglyph, temp, looklistindex])
+
+    print("number of LA substitutions type 6 =", j)
+    #print((subst6List))
+    print("number of BT substitutions type 6 =", jBT)
+    #print((subst6BTList))
+
+    if debug:
+        print(subst6List)
+        print(subst6BTList)
+
+    # get char substitution LA type 1 list here
+    j = 0
+
+    for row in subst6List:
+        subset6index = row[5]
+        if subset6index not in lookupByIndex:
+            continue
+        for inglyph, outglyph in substitutions(lookupByIndex[subset6index]):  # for in glyph
+            subst1List.append((subset6index, inglyph, outglyph))
+            j = j + 1
+            if debug:
+                if inglyph == glyphIDs.get('uni0940'):  # for debugging a particular char
+                    print("inglyph name= ", [inglyph, outglyph])
+
+    print("number of LA substitutions type 1 =", j)
+    #print(subst1List)
+
+    # LA type 6 entries for each input glyph as (entry, coverage position) pairs, in table order
+    subst6Index = {}
+    for i3, row in enumerate(subst6List):
+        for i4, inputglyph in enumerate(row[3]):
+            subst6Index.setdefault(inputglyph, []).append((i3, i4))
+
+    # LA type 1 substitution for each lookup index; the last one in the table wins
+    subst1Map = {}
+    for subset6index, inglyph, outglyph in subst1List:
+        subst1Map[subset6index] = outglyph
+
+    # look ahead glyphs of each LA type 6 entry as a set, for the membership tests
+    subst6ContextSets = tuple(frozenset(row[4]) for row in subst6List)
+
+    # LA type 6 entries that can substitute, for each pair of current and next glyph, so
+    # the main loop does not visit the entries whose next glyph test fails anyway. Only
+    # the one char ('0' '0') and two char ('1' '0') entries with a type 1 lookup do
+    # anything; a one char entry is listed for each glyph of its look ahead list, a two
+    # char entry for the second glyph of its input sequence
+    subst6PairIndex = {}
+    for i3, (inputpos, contextpos, _, inputglyphs, contextglyphs, lookupindex) in enumerate(subst6List):
+        if lookupindex not in subst1Map:
+            continue
+        if inputpos == '0' and contextpos == '0':
+            nextglyphs = set(contextglyphs)
+        elif inputpos == '1' and contextpos == '0':
+            nextglyphs = {inputglyphs[1]}
+        else:
+            continue
+        for i4, inputglyph in enumerate(inputglyphs):
+            for nextglyph in nextglyphs:
+                subst6PairIndex.setdefault((inputglyph, nextglyph), []).append((i3, i4))
 
-if debug:
-    print(subst6BTList)
-
-# get char substitution LA type 1 list here
-j = 0
-
-for k in range(0, len(subst6List)):
-    for c in root.iter('Lookup'):
-        subset6index = c.get('index')
-        if subst6List[k][5] == subset6index:  # check in right order
-            for d in c.iter('Substitution'):  # effectively search on for type 4 subst
-                inglyph = (d.get('in'))  # for in glyph
-                outglyph = (d.get('out'))  # for in glyph
-                subst1List.append([subset6index, inglyph, outglyph])
-                j = j + 1
-                if debug:
-                    if (inglyph == 'uni0940'):  # for debugging a particular char
-                        print("inglyph name= ", [inglyph, outglyph])
-            continue  # get substitute list in correct order
+    if debug:
+        print(subst1List)
 
-print("number of LA substitutions type 1 =", j)
-#print(subst1List)
+    # get char substitution BT type 1 list here, easier to work with glyph ID, so get glyph ID
+    j = 0
 
-if debug:
-    print(subst1List)
-
-# get char substitution BT type 1 list here, easier to work with glyph ID, so get glyph ID
-j = 0
-
-for k in range(0, len(subst6BTList)):
-    for c in root.iter('Lookup'):
-        subset6BTindex = c.get('index')
-        if subst6BTList[k][5] == subset6BTindex:  # check in right order
-            for d in c.iter('Substitution'):  # effectively search on for type 4 subst
-                inglyph = (d.get('in'))  # for in glyph
-                outglyph = (d.get('out'))  # for in glyph
-                subst1BTList.append([subset6BTindex, inglyph, outglyph])
-                j = j + 1
-                if debug:
-                    if (inglyph == 'uni0940'):  # for debugging a particular char in cmap names
-                        print("inglyph name= ", [inglyph, outglyph])
-            continue  # get substitute list in correct order
+    for row in subst6BTList:
+        subset6BTindex = row[5]
+        if subset6BTindex not in lookupByIndex:
+            continue
+        for inglyph, outglyph in substitutions(lookupByIndex[subset6BTindex]):  # for in glyph
+            subst1BTList.append((subset6BTindex, inglyph, outglyph))
+            j = j + 1
+            if debug:
+                if inglyph == glyphIDs.get('uni0940'):  # for debugging a particular char in cmap names
+                    print("inglyph name= ", [inglyph, outglyph])
+
+    print("number of BT substitutions type 1 =", j)
+
+    # BT type 1 substitution for each lookup index; the last one in the table wins
+    subst1BTMap = {}
+    for subset6BTindex, inglyph, outglyph in subst1BTList:
+        subst1BTMap[subset6BTindex] = outglyph
+    #print(subst1BTList)
+
+    if debug:
+        print(subst1BTList)
+
+    # the fields of the BT type 6 table that the main loop reads, one tuple per field:
+    # the kind of entry (1 for one char '0' '0', 2 for two char '1' '0', 0 for the rest),
+    # the input glyphs, the back track glyphs as a set for the membership tests, and the
+    # lookup index
+    subst6BTKinds = tuple(1 if row[0] == '0' and row[1] == '0' else 2 if row[0] == '1' and row[1] == '0' else 0
+                          for row in subst6BTList)
+    subst6BTInputs = tuple(row[3] for row in subst6BTList)
+    subst6BTContexts = tuple(frozenset(row[4]) for row in subst6BTList)
+    subst6BTLookups = tuple(row[5] for row in subst6BTList)
+
+    # BT type 6 entries for each pair of current and previous glyph as (entry, coverage
+    # position) pairs, in table order: a one char entry is listed for each glyph of its
+    # back track list, a two char entry for the second glyph of its input sequence.
+    # Entries of other kinds never look at the word, so they are left out
+    subst6BTPairIndex = {}
+    for i3, entrykind in enumerate(subst6BTKinds):
+        if entrykind == 1:
+            prevglyphs = set(subst6BTContexts[i3])
+        elif entrykind == 2:
+            prevglyphs = {subst6BTInputs[i3][1]}
+        else:
+            continue
+        for i4, inputglyph in enumerate(subst6BTInputs[i3]):
+            for prevglyph in prevglyphs:
+                subst6BTPairIndex.setdefault((inputglyph, prevglyph), []).append((i3, i4))
+
+    # glyphs that start a BT type 6 entry that looks at the previous glyph, and an entry
+    # of any of the type 4, 5 or 6 tables; the main loop does not look into a table for
+    # any other glyph
+    subst6BTGlyphs = frozenset(inputglyph for inputglyph, prevglyph in subst6BTPairIndex)
+    activeGlyphs = frozenset(set(substIndex) | set(subst5Index) | set(subst6Index) | subst6BTGlyphs)
+
+    return {
+        "rephlookupList": rephlookupList,
+        "rakaarlookupList": rakaarlookupList,
+        "enablereph": enablereph,
+        "enablerakaar": enablerakaar,
+        "rakaarIndex": rakaarIndex,
+        "substList": substList,
+        "substIndex": substIndex,
+        "ligatureTrie": ligatureTrie,
+        "zwnjLigatureMap": zwnjLigatureMap,
+        "subst5List": subst5List,
+        "subst5Index": subst5Index,
+        "subst5ClassMap": subst5ClassMap,
+        "subst5RuleMap": subst5RuleMap,
+        "subst5SubstMap": subst5SubstMap,
+        "subst6List": subst6List,
+        "subst1Map": subst1Map,
+        "subst6ContextSets": subst6ContextSets,
+        "subst6PairIndex": subst6PairIndex,
+        "subst1BTMap": subst1BTMap,
+        "subst6BTKinds": subst6BTKinds,
+        "subst6BTInputs": subst6BTInputs,
+        "subst6BTContexts": subst6BTContexts,
+        "subst6BTLookups": subst6BTLookups,
+        "subst6BTPairIndex": subst6BTPairIndex,
+        "subst6BTGlyphs": subst6BTGlyphs,
+        "activeGlyphs": activeGlyphs,
+        "extraGlyphIDs": extraGlyphIDs,  # IDs given out by glyphid() while reading
+    }
+
+
+# the GSUB tables depend only on the font file and the language settings, so
+# they are pickled into the cache folder and read back on the next start, as
+# long as the font file has not changed
+cacheFile = os.path.join("cache", os.path.basename(fontFile) + "." + ACTIVE_LANG + ".pkl")
+cacheVersion = 18  # bump this when the layout of the cached tables changes
+cacheKey = (cacheVersion, os.path.getmtime(fontFile), os.path.getsize(fontFile), fontNumber, doreph, dorakaar,
+            Deva, langConfig)  # the language settings pick the features the tables are read from
+
+fontCache = None
+try:
+    with open(cacheFile, "rb") as f:
+        fontCache = pickle.load(f)
+except Exception:  # a missing, truncated or foreign cache file is read again from the font
+    fontCache = None
+
+if isinstance(fontCache, tuple) and len(fontCache) == 2 and isinstance(fontCache[1], dict) \
+        and fontCache[0] == cacheKey:
+    fontTables = fontCache[1]
+    print("GSUB tables read from", cacheFile)
+else:
+    fontTables = readtables()
+    # save the tables for the next start
+    try:
+        os.makedirs("cache", exist_ok=True)
+        with open(cacheFile, "wb") as f:
+            pickle.dump((cacheKey, fontTables), f)
+    except OSError:
+        print("could not write the GSUB table cache", cacheFile)
+
+extraGlyphIDs.update(fontTables["extraGlyphIDs"])
+rephlookupList = fontTables["rephlookupList"]
+rakaarlookupList = fontTables["rakaarlookupList"]
+enablereph = fontTables["enablereph"]
+enablerakaar = fontTables["enablerakaar"]
+rakaarIndex = fontTables["rakaarIndex"]
+substList = fontTables["substList"]
+substIndex = fontTables["substIndex"]
+ligatureTrie = fontTables["ligatureTrie"]
+zwnjLigatureMap = fontTables["zwnjLigatureMap"]
+subst5List = fontTables["subst5List"]
+subst5Index = fontTables["subst5Index"]
+subst5ClassMap = fontTables["subst5ClassMap"]
+subst5RuleMap = fontTables["subst5RuleMap"]
+subst5SubstMap = fontTables["subst5SubstMap"]
+subst6List = fontTables["subst6List"]
+subst1Map = fontTables["subst1Map"]
+subst6ContextSets = fontTables["subst6ContextSets"]
+subst6PairIndex = fontTables["subst6PairIndex"]
+subst1BTMap = fontTables["subst1BTMap"]
+subst6BTKinds = fontTables["subst6BTKinds"]
+subst6BTInputs = fontTables["subst6BTInputs"]
+subst6BTContexts = fontTables["subst6BTContexts"]
+subst6BTLookups = fontTables["subst6BTLookups"]
+subst6BTPairIndex = fontTables["subst6BTPairIndex"]
+subst6BTGlyphs = fontTables["subst6BTGlyphs"]
+activeGlyphs = fontTables["activeGlyphs"]
 
-print("number of BT substitutions type 1 =", j)
-#print(subst1BTList)
+# get mapped glyph names for unicode codes from cmap data
+# one dict keyed by unicode code; a later cmap subtable overrides an earlier one
+cmapDict = {}
+for cmapTable in font2["cmap"].tables:
+    cmapDict.update(cmapTable.cmap)
+print("total number of all glyphs in cmap=", len(cmapDict))
+#print(cmapDict)
+
+# IDs used in a word for the special chars, instead of their cmap glyphs
+specialIDs = {
+    0x0a: LFMark,  # assume all these are CR returns
+    0x0d: CRMark,
+    0x20: SpaceMark,
+    0x2008: SpaceMark,
+    0x2009: SpaceMark,
+    0x200c: ZWNJMark,
+    0x200d: ZWJMark,
+    0x2028: LineBreakMark,  # line break actually
+    0x2029: ParaSeparatorMark,  # para separator
+}
+
+# glyph ID in a word for each unicode code
+charIDs = dict(zip(cmapDict, map(glyphid, cmapDict.values())))
+charIDs.update(specialIDs)
+
+# text in the third window for each glyph ID in a word
+glyphCodes = {glyphID: "g+" + format(glyphID, "x") for glyphID in glyphIDs.values()}
+# a glyphN name outside the glyph order is shown as glyph N, as fontTools numbers it;
+# any other such name has no glyph code, and showing it raises KeyError
+for glyphName, glyphID in extraGlyphIDs.items():
+    if glyphName[:5] == "glyph":
+        try:
+            glyphCodes[glyphID] = "g+" + format(int(glyphName[5:]), "x")
+        except ValueError:
+            pass
+glyphCodes.update({noGlyph: "", LFMark: "\n", CRMark: "\r", ZWNJMark: "", ZWJMark: "", SpaceMark: " ",
+                   LineBreakMark: "u+2028", ParaSeparatorMark: "u+2029"})
+
+
+def cmapid(code):
+    # glyph ID of the cmap glyph for a unicode code, absentGlyph if there is none
+    if code in cmapDict:
+        return glyphid(cmapDict[code])
+    return absentGlyph
+
+
+# find glyph IDs for CR and LF in cmap
+CRID = cmapid(0xa)
+LFID = cmapid(0xd)
+SpaceID = cmapid(0x20)
+ZWNJID = cmapid(0x200c)
+ZWJID = cmapid(0x200d)
+rephID = absentGlyph
+viramaID = absentGlyph
+
+# glyph IDs of the vowel signs checked after a reph, as sets for the membership tests
+rephTopIDs = frozenset()
+rephPreIDs = frozenset()
+rephBottomIDs = frozenset()
 
-if debug:
-    print(subst1BTList)
+if Deva:
+    rephID = cmapid(rephsign[0])
+    viramaID = cmapid(viramasign[0])
+    rephTopIDs = frozenset(cmapid(code) for code in rephTopVowels)
+    rephPreIDs = frozenset(cmapid(code) for code in rephPreVowels)
+    rephBottomIDs = frozenset(cmapid(code) for code in rephBottomVowels)
 
-k = 0
-cmapList = []
-# get mapped glyph names for unicode codes from cmap data
-for Map in root.iter('map'):
-    mapCode = str(Map.get('code'))
-    glyphName = str(Map.get('name'))
-    cmapList.append([mapCode, glyphName])
-    k = k + 1
-print("total number of all glyphs in cmap=", k)
-#print(cmapList)
-
-# find names for CR and LF names in cmap
-CRName = ""
-LFName = ""
-SpaceName = ""
-ZWNJName = ""
-ZWJName = ""
-rephname = ""
-viramaname = ""
-
-# list of vowel names
-vowelname0a = ""
-vowelname1b = ""
-vowelname0 = ""
-vowelname1 = ""
-vowelname2 = ""
-vowelname3 = ""
-vowelname4 = ""
-vowelname5 = ""
-vowelname6 = ""
-vowelname7 = ""
-vowelname8 = ""
-vowelname9 = ""
-vowelname10 = ""
-vowelname11 = ""
-vowelname12 = ""
-vowelname13 = ""
-vowelname14 = ""
-vowelname15 = ""
-
-for k in range(0, len(cmapList)):
-    if cmapList[k][0] == '0xa':
-        CRName = cmapList[k][1]
-    if cmapList[k][0] == '0xd':
-        LFName = cmapList[k][1]
-    if cmapList[k][0] == '0x20':
-        SpaceName = cmapList[k][1]
-    if cmapList[k][0] == '0x200c':
-        ZWNJName = cmapList[k][1]
-    if cmapList[k][0] == '0x200d':
-        ZWJName = cmapList[k][1]
-    if Deva and cmapList[k][0] == rephsign[0]:
-        rephname = cmapList[k][1]
-    if Deva and cmapList[k][0] == viramasign[0]:
-        viramaname = cmapList[k][1]
-
-    if Deva and cmapList[k][0] == '0x93e':
-        vowelname0a = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x93f':
-        vowelname1b = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x940':
-        vowelname0 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x941':
-        vowelname1 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x942':
-        vowelname2 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x943':
-        vowelname3 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x944':
-        vowelname4 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x945':
-        vowelname5 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x946':
-        vowelname6 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x947':
-        vowelname7 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x948':
-        vowelname8 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x949':
-        vowelname9 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x94a':
-        vowelname10 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x94b':
-        vowelname11 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x94c':
-        vowelname12 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x94d':
-        vowelname13 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x94e':
-        vowelname14 = cmapList[k][1]
-    if Deva and cmapList[k][0] == '0x94f':
-        vowelname15 = cmapList[k][1]
-
-#print("reph, virama name = ", rephname, viramaname)
-#print("CR, LF names =", CRName, LFName)
+# glyphs that end a word for the reph pass
+rephEndIDs = frozenset((SpaceID, noGlyph))
+
+#print("reph, virama ID = ", rephID, viramaID)
+#print("CR, LF IDs =", CRID, LFID)
 
 # initialize some variables
 l = 0
@@ -767,45 +886,40 @@ ll = 0
 
 # get glyphIDs for pre-postion and post-position glyphs
 # assume that they must be in the unicode fonts!
-for l in range(0, len(prepChar)):
-    for ll in range(0, len(cmapList)):
-        if prepChar[l] == cmapList[ll][0]:
-            prepglyID[l] = font2.getGlyphID(cmapList[ll][1])
-            continue
+for l, code in enumerate(prepChar):
+    if code in cmapDict:
+        prepglyID[l] = glyphid(cmapDict[code])
 
 if debug:
     print("pre-position one char glyph IDs = ", prepglyID)  # like கெ கே கை
 
 # assume that they must be in the unicode fonts!
-for l in range(0, len(prep2Char)):
-    for ll in range(0, len(cmapList)):
-        if prep2Char[l] == cmapList[ll][0]:
-            prep2glyID[l] = font2.getGlyphID(cmapList[ll][1])
-            continue
+for l, code in enumerate(prep2Char):
+    if code in cmapDict:
+        prep2glyID[l] = glyphid(cmapDict[code])
 
 if debug:
     print("pre-position two char glyph IDs = ", prep2glyID)  # கொ கோ கௌ
 
 # assume that they must be in the unicode fonts!
-for l in range(0, len(preapp2Char)):
-    for ll in range(0, len(cmapList)):
-        if preapp2Char[l] == cmapList[ll][0]:
-            preapp2glyID[l] = font2.getGlyphID(cmapList[ll][1])
-            continue
+for l, code in enumerate(preapp2Char):
+    if code in cmapDict:
+        preapp2glyID[l] = glyphid(cmapDict[code])
 
 if debug:
     print("pre-append two char glyph IDs = ", preapp2glyID)  # like the first glyph in after கௌ
 
 # assume that they must be in the unicode fonts!
-for l in range(0, len(post2Char)):
-    for ll in range(0, len(cmapList)):
-        if post2Char[l] == cmapList[ll][0]:
-            post2glyID[l] = font2.getGlyphID(cmapList[ll][1])
-            continue
+for l, code in enumerate(post2Char):
+    if code in cmapDict:
+        post2glyID[l] = glyphid(cmapDict[code])
 
 if debug:
     print("post-append char glyph IDs = ", post2glyID)  # like the third ள glyph after கௌ
 
+prepIDSet = frozenset(prepglyID)
+prep2IDSet = frozenset(prep2glyID)
+
 # open Tk window
 root = Tk()
 root.title('A simple Unicode to opentype glyph format converter for Affinity programs')
@@ -852,7 +966,8 @@ def clear_all():
     textBox.delete("1.0", END)  # clear text boxes
     textBox2.delete("1.0", END)
     textBox3.delete("1.0", END)
-    print('screen and clipboard cleared')
+    convert_word.cache_clear()  # forget the words converted so far
+    print('screen, clipboard and word cache cleared')
 
 
 def copy_clipboard():  # copy glyph string in third window
@@ -863,495 +978,497 @@ def copy_clipboard():  # copy glyph string in third window
     print('copy to clipboard done')
 
 
-# the main routine to read copied data in the first window, do all the substitutions,
-# and display the final converted file in the third window! The second windows shows
-# unicode values of the input chars, useful for debugging.
-
-def retrieve_input():
-
-    global finalDisp  # global so can be used in routines
-    global uniDisp  # display unicode value in 2nd window for debugging
-
-    finalDisp = ""  # initialize final display string in third window!
-    uniDisp = ""  # initialize unicode display string 2nd window!
-
-    #   manipulate the unicode string and convert
-    inputValue = textBox.get("1.0", "end-1c")
-    #inputValue = inputValue  # pad extra 3 space for level 3
-
-    charAppend = ""  # char append variable in third window
-    uniAppend = ""  # unicode char append variable in 2nd window for debug
-
-    startpos = 0  # start postion of the char in the word
-
-    # split input text into words for easier processing. Look for space breaks
-    for ijk in range(startpos, len(inputValue)):  # for display unicode values in second window
-
-        uniDisp = uniDisp + uniAppend  # for displaying unicode string 2nd window
-        word = ""
-
-        uniAppend = hex(ord(inputValue[ijk]))+","
-        if ord(inputValue[ijk]) < 31:
-            uniAppend = "\n"
-            #charAppend = "\n"
-            continue
-
-        #read one word at a time by looking for space or CR
-
-        for ii in range(startpos, len(inputValue)):
-            word = word + (inputValue[ii])
-            startpos = ii+1   # move to next postion
-            if ord(inputValue[ii]) == 32:  # include space and below for word end!
-                break  # break the above ii loop and continue
-
-            # if ord(inputValue[ii]) < 32:  # include space and below for word end!
-            #     word = word + "\r"
-            #     continue  # break the above ii loop and continue
-
-        # ignore empty spaces at the end of textbox
-        if word == "":
-            continue
-
-        if debug:
-            print("ijk, word =", ijk, word)
-
-        wordname = [None]*(len(word)+2)  # pad 2 extra space for reph or rakaar search
-
-        # convert chars in word to nameList (for special chars like CR, LF)
-        for i in range(0, len(cmapList)):
-            for i2 in range(0, len(word)):
-                # assume all these are CR returns
-                if ord(word[i2]) == 0x0a :
-                    wordname[i2] = 'LFName'
-                elif ord(word[i2]) == 0x0d :
-                    wordname[i2] = 'CRName'
-                elif ord(word[i2]) == 0x20:
-                    wordname[i2] = 'SpaceName'
-                elif ord(word[i2]) == 0x2008:
-                    wordname[i2] = 'SpaceName'
-                elif ord(word[i2]) == 0x2009:
-                    wordname[i2] = 'SpaceName'
-                elif ord(word[i2]) == 0x200c:
-                    wordname[i2] = 'ZWNJName'
-                elif ord(word[i2]) == 0x200d:
-                    wordname[i2] = 'ZWJName'
-                elif ord(word[i2]) == 0x2028 :  # line break actually
-                    wordname[i2] = 'LineBreak'
-                elif ord(word[i2]) == 0x2029 :  # para separator
-                    wordname[i2] = 'ParaSeparator'
-                elif hex(ord(word[i2])) == cmapList[i][0]:
-                    wordname[i2] = cmapList[i][1]
-                # elif (ord(word[i2]) < uniRange[0] or ord(word[i2]) > uniRange[1]):
-                #     wordname[i2] = word[i2]
-
-        if debug:
-            print("ijk, wordname =", ijk, wordname)
-
-        # swap first
-        wordnamelen = len(wordname)  # word size has changed after reph
+def nextentry(index, glyph, lastentry):
+    # first entry after lastentry in a table index for this glyph, or None;
+    # the tables are walked in order, but only through the entries of the current glyph
+    entries = index.get(glyph)
+    if entries:
+        k = bisect_right(entries, lastentry)
+        if k < len(entries):
+            return entries[k]
+    return None
+
+
+def delglyphs(wordname, pos, count):
+    # same as count times "del wordname[pos]" but with a single move of the list tail;
+    # a negative pos deletes backwards from there, just like the repeated del does
+    if pos < 0:
+        pos = pos + len(wordname) - count + 1
+    if pos < 0 or pos + count > len(wordname):
+        raise IndexError("list assignment index out of range")
+    del wordname[pos:pos + count]
+
+
+# the type 6 substitutions for one char only depend on the char and the two chars
+# after it (LA) or before it (BT), and not on the rest of the word, so each walk of
+# the tables is done once for each such sequence of glyphs and then served from the
+# cache. A None for the second char means it is outside the word. Both return the
+# new glyph and whether any substitution was done
+
+@functools.lru_cache(maxsize=65536)
+def subst6lookahead(glyph, nextglyph, nextglyph2, debug=debug, nextentry=nextentry, subst6List=subst6List,
+                    subst6PairIndex=subst6PairIndex, subst6ContextSets=subst6ContextSets, subst1Map=subst1Map):
+    # visit the table entries for the current char in table order; after a
+    # substitution only the entries past this one are checked for the new char
+    substdone = False
+    lastmatch = (-1, -1)
+    while True:
+        # current char is in type 6 subst list, with a next char that can match
+        lastmatch = nextentry(subst6PairIndex, (glyph, nextglyph), lastmatch)
+        if lastmatch is None:
+            break
+        # the matched table entry, unpacked once into locals, with its look ahead glyphs as a set
+        inputpos, contextpos, _, inputglyphs, _, lookupindex = subst6List[lastmatch[0]]
+        contextglyphs = subst6ContextSets[lastmatch[0]]
+        if inputpos == '0' and contextpos == '0': # only one char
+            if nextglyph in contextglyphs:  # see if next word char is in list
+                if debug:
+                    print("after subst6 0 0 ", nextglyph, lookupindex)
+                if lookupindex in subst1Map:
+                    if debug:
+                        print("final before LA 0 0", glyph, lookupindex, subst1Map[lookupindex])
+                    glyph = subst1Map[lookupindex]  # read subst char name from list 1
+                    substdone = True
+
+        # an entry is of one kind only, so the two char test is skipped after the one char one
+        elif inputpos == '1' and contextpos == '0':  # two consecutive chars and one char subst
+            if nextglyph == inputglyphs[1]:  # two chars seq. found
+                if nextglyph2 is None:
+                    # the word has no third char, as wordname[charpos + 2] would tell
+                    raise IndexError("array index out of range")
+                if nextglyph2 in contextglyphs:  # third word char is in list 6
+                    if debug:
+                        print("after subst6 1 0 ", nextglyph2, nextglyph, lookupindex)
+                    if lookupindex in subst1Map:
+                        if debug:
+                            print("final LA 1 0 before", glyph, lookupindex, subst1Map[lookupindex])
+                        glyph = subst1Map[lookupindex]  # now subst ar char postion
+                        substdone = True
+
+    return glyph, substdone
+
+
+@functools.lru_cache(maxsize=65536)
+def subst6backtrack(glyph, prevglyph, prevglyph2, debug=debug, nextentry=nextentry,
+                    subst6BTPairIndex=subst6BTPairIndex, subst6BTKinds=subst6BTKinds, subst6BTInputs=subst6BTInputs,
+                    subst6BTContexts=subst6BTContexts, subst6BTLookups=subst6BTLookups, subst1BTMap=subst1BTMap):
+    # same walk as for LA: only the BT entries listing the current and previous
+    # char, in table order
+    substdone = False
+    lastmatch = (-1, -1)
+    while True:
+        # current word char in BT list
+        lastmatch = nextentry(subst6BTPairIndex, (glyph, prevglyph), lastmatch)
+        if lastmatch is None:
+            break
+        # the fields of the matched table entry
+        i3 = lastmatch[0]
+        entrykind = subst6BTKinds[i3]
+        contextglyphs = subst6BTContexts[i3]
+        lookupindex = subst6BTLookups[i3]
+        if entrykind == 1:
+            if prevglyph in contextglyphs:  # check if previous char is BT list
+                if debug:
+                    print("after subst6BT 0 0 ", prevglyph, lookupindex)
+                if lookupindex in subst1BTMap:
+                    if debug:
+                        print("final BT  0 0 before", glyph, lookupindex, subst1BTMap[lookupindex])
+                    glyph = subst1BTMap[lookupindex]
+                    substdone = True
+
+        elif entrykind == 2:  # two char sequence
+            if prevglyph == subst6BTInputs[i3][1]:  # prev. char in two chars seq.
+                if prevglyph2 is None:
+                    # the word has no char before the previous one, as wordname[charpos - 2] would tell
+                    raise IndexError("array index out of range")
+                if prevglyph2 in contextglyphs: # check prev. to prev. char
+                    if debug:
+                        print("after subst6 1 0 ", prevglyph2, lookupindex)
+                    if lookupindex in subst1BTMap:
+                        if debug:
+                            print("final BT 1 0 before", glyph, lookupindex, subst1BTMap[lookupindex])
+                        glyph = subst1BTMap[lookupindex]
+                        substdone = True
+
+    return glyph, substdone
+
+
+# convert one word to its glyph string for the third window; the result only
+# depends on the word and the font tables, so repeated words are served from the cache.
+# The tables read for every char, and the debug switch tested all through the
+# loops, are bound as default arguments, so that they are fast local variables
+# inside; only the word is ever passed in
+
+@functools.lru_cache(maxsize=4096)
+def convert_word(word, debug=debug, charIDs=charIDs, glyphCodes=glyphCodes, activeGlyphs=activeGlyphs,
+                 nextentry=nextentry, delglyphs=delglyphs, bisect_right=bisect_right,
+                 rakaarlookupList=rakaarlookupList, rakaarIndex=rakaarIndex,
+                 substList=substList, substIndex=substIndex, ligatureTrie=ligatureTrie,
+                 zwnjLigatureMap=zwnjLigatureMap, subst5List=subst5List, subst5Index=subst5Index,
+                 subst5ClassMap=subst5ClassMap, subst5RuleMap=subst5RuleMap, subst5SubstMap=subst5SubstMap,
+                 subst6lookahead=subst6lookahead, subst6backtrack=subst6backtrack, subst6BTGlyphs=subst6BTGlyphs):
+
+    # convert chars in word to glyph IDs (special IDs for chars like CR, LF)
+    # pad 2 extra space for reph or rakaar search; kept as a C int array that is
+    # allocated once at its full size, padding included
+    wordname = array.array('i', [charIDs.get(code, noGlyph) for code in map(ord, word)] + [noGlyph, noGlyph])
+
+    if debug:
+        print("word, wordname =", word, wordname)
+
+    # swap first
+    wordnamelen = len(wordname)  # word size has changed after reph
+    # each pass below is skipped as a whole when it is switched off or has nothing to do
+    if swapappends and prepglyID:  # skip swapping prefix postfix glyphs if disabled
         for j2 in range(0, len(wordname)-1):  # skip the last one during swap!
             # now do swapping for pre-position chars
-            if not swapappends:
-                continue  # skip swapping prefix postfix glyphs
-            for i4 in range(0, len(prepglyID)):
-                if wordname[j2 + 1] == font2.getGlyphName(prepglyID[i4]):
+            if wordname[j2 + 1] not in prepIDSet:
+                continue  # not a pre-position char
+            for prepID in prepglyID:
+                if wordname[j2 + 1] == prepID:
                     tempvalue = wordname[j2]
                     wordname[j2] = wordname[j2 + 1]
                     wordname[j2 + 1] = tempvalue   # swapping done
-                    continue
 
+    if swapappends and prep2glyID:
         for j2 in range(0, len(wordname) - 1):
             # now do swapping for pre-postion and post-position chars
-            if not swapappends:
-                continue  # skip swapping prefix postfix glyphs
-            for i4 in range(0, len(prep2glyID)):
-                if wordname[j2 + 1] == font2.getGlyphName(prep2glyID[i4]):
+            if wordname[j2 + 1] not in prep2IDSet:
+                continue  # not a two part pre-position char
+            for i4, prep2ID in enumerate(prep2glyID):
+                if wordname[j2 + 1] == prep2ID:
                     if j2 - 1 < 0:  # if in 0th place insert there, otherwise normal insert
-                        wordname.insert(0, font2.getGlyphName(preapp2glyID[i4]))
+                        wordname.insert(0, preapp2glyID[i4])
                     else:
-                        wordname.insert(j2, font2.getGlyphName(preapp2glyID[i4]))  # pre-position glyph normal insert
-                    wordname[j2 + 2] = font2.getGlyphName(post2glyID[i4])  # post-position glyph insert after char
-                    continue
-        if debug:
-            print("after all swapping done", wordname)
-
-        # do rakaar now
-        nextpos = 0
-        rakaarreplace  = 0
-        charpos = 0
-        wordnamelen = len(wordname)
-
+                        wordname.insert(j2, preapp2glyID[i4])  # pre-position glyph normal insert
+                    wordname[j2 + 2] = post2glyID[i4]  # post-position glyph insert after char
+    if debug:
+        print("after all swapping done", wordname)
+
+    # do rakaar now
+    nextpos = 0
+    rakaarreplace  = 0
+    charpos = 0
+    wordnamelen = len(wordname)
+
+    if enablerakaar and rakaarlookupList:
         for i2 in range(nextpos, wordnamelen):
             charpos = i2 - rakaarreplace  # current char position in word
-            if Deva and enablerakaar and dorakaar:
-                # search rakaar subst list
-                # now do rakaar substitution
-                for i3 in range(0, len(rakaarlookupList)):
-                    if wordname[charpos] == rakaarlookupList[i3][0]:  # current char is in subst list
-                        rakaarsubstword = wordname[charpos]
-                        rakaarsubstComponent = rakaarlookupList[i3][1]
-                        rakaarsubstValue = rakaarlookupList[i3][2]
-
-                        if len(rakaarsubstComponent) == 2:  # do double chars subst
-                            if (rakaarsubstComponent[0] == wordname[charpos + 1]) and (
-                                    rakaarsubstComponent[1] == wordname[charpos + 2]):
-                                #print("before rakaar =", wordname)
-                                wordname[charpos] = rakaarsubstValue
-                                del wordname[charpos + 1]  # delete that replaced char
-                                del wordname[charpos + 1]
-                                wordnamelen = wordnamelen - 2
-                                nextpos = charpos + 1  # we deleted two char, so nextpos is +1
-                                rakaarreplace = rakaarreplace + 2
-                                rakaarsubstdone = True
-                                #print("after rakaar =", wordname)
-                                continue  # break i3 loop
-
-        # do reph first
-        rephreplace = 0
-        wordnamelen = len(wordname)
+            # search rakaar subst list
+            # now do rakaar substitution
+            i3 = -1
+            # entries for the current char, in table order; after a substitution
+            # the rest of them are tried on the new char
+            while True:
+                i3 = nextentry(rakaarIndex, wordname[charpos], i3)
+                if i3 is None:
+                    break
+                rakaarsubstword = wordname[charpos]
+                rakaarsubstComponent = rakaarlookupList[i3][1]
+                rakaarsubstValue = rakaarlookupList[i3][2]
+
+                if len(rakaarsubstComponent) == 2:  # do double chars subst
+                    if (rakaarsubstComponent[0] == wordname[charpos + 1]) and (
+                            rakaarsubstComponent[1] == wordname[charpos + 2]):
+                        #print("before rakaar =", wordname)
+                        wordname[charpos] = rakaarsubstValue
+                        delglyphs(wordname, charpos + 1, 2)  # delete the replaced chars
+                        wordnamelen = wordnamelen - 2
+                        nextpos = charpos + 1  # we deleted two char, so nextpos is +1
+                        rakaarreplace = rakaarreplace + 2
+                        rakaarsubstdone = True
+                        #print("after rakaar =", wordname)
+
+    # do reph first
+    rephreplace = 0
+    wordnamelen = len(wordname)
+    if enablereph:
         for jj2 in range(0, len(wordname)):
             j2 = jj2 - rephreplace
-            if Deva and enablereph and doreph:
-                # do reph swapping if first and second char are ra and virama
-                # just shift by two chars and hope for the best!
-                if wordname[j2] == rephname:
-                    if len(wordname) > j2 + 2:
-                        if wordname[j2 + 1] == viramaname:  # reph sequence found
-                            #print("before reph =", wordname)
-                            # ignore reph subst at the end of the word
-                            if wordname[j2 + 2] == SpaceName or \
-                                    wordname[j2 + 2] == "," or \
-                                    wordname[j2 + 2] is None or \
-                                    wordname[j2 + 2] == ".":
+            # do reph swapping if first and second char are ra and virama
+            # just shift by two chars and hope for the best!
+            if wordname[j2] == rephID:
+                if len(wordname) > j2 + 2:
+                    if wordname[j2 + 1] == viramaID:  # reph sequence found
+                        #print("before reph =", wordname)
+                        # ignore reph subst at the end of the word
+                        if wordname[j2 + 2] in rephEndIDs:
+                            continue
+                        # look for a vowel sign after the consonant
+                        elif wordname[j2 + 3] in rephTopIDs or wordname[j2 + 2] in rephPreIDs:
+                            # note: vowel sign 0x93f has been swapped earlier; it is at j2+2
+                            # now shift reph sign to correct location
+                            wordname[j2] = wordname[j2 + 2]
+                            wordname[j2 + 1] = wordname[j2 + 3]
+                            wordname[j2 + 2] = rephlookupList[0][2]
+                            del wordname[j2 + 3]
+                            #del wordname[j2 + 3]
+                            rephreplace = rephreplace + 1
+                        # look other type of vowel after consonant that attaches at bottom
+                        elif wordname[j2 + 3] in rephBottomIDs:
+
+                            # move reph sign to correct location
+                            delglyphs(wordname, j2, 2)  # delete ra and virama
+                            wordname[j2 + 2] = rephlookupList[0][2]
+                            rephreplace = rephreplace + 2
+
+                        else:
+                            # a simple consonant after reph
+                            wordname[j2] = wordname[j2 + 2]
+                            wordname[j2 + 1] = rephlookupList[0][2]
+                            del wordname[j2 + 2]
+                            rephreplace = rephreplace + 1
+                        #print("after reph =", wordname)
+
+    # when no glyph of the word starts a substitution, the main loop below would only
+    # make one pass that changes nothing, so go straight to the char append
+    if activeGlyphs.isdisjoint(wordname):
+        return "".join(map(glyphCodes.__getitem__, wordname))
+
+    wordnamelen = len(wordname)
+    # now the main loop for type 4 and type 6 substitutions
+    for ij in range(0, len(wordname)):
+        nextpos = 0
+        replace = 0
+        charpos = 0
+        substdone = False  # subst not done yet
+
+        for i2 in range(nextpos, wordnamelen):
+            charpos = i2 - replace  # current char position in word
+            if wordname[charpos] not in activeGlyphs:
+                continue  # no substitution starts with this glyph
+
+            # now do type 5 substitution
+            i3 = -1
+            if lookuptype5:
+                while True:  # entries for the current char, in table order
+                    i3 = nextentry(subst5Index, wordname[charpos], i3)
+                    if i3 is None:
+                        break
+                    tablenumber = subst5List[i3][0]
+                    for wordclass in subst5ClassMap.get((tablenumber, wordname[charpos]), ()):
+                        # print("we are in classdef table stage 1 now",  tablenumber, wordclass,
+                        #       wordname[charpos], wordname[charpos+1])
+
+                        # now get the type 5 rule lookup rule
+                        for lookupnumber2, rulenumber2 in subst5RuleMap.get((tablenumber, wordclass), ()):
+                            if lookupnumber2 == "0":
                                 continue
-                            # look for a vowel sign after the consonant
-                            elif wordname[j2 + 3] == vowelname0 or \
-                                wordname[j2 + 3] == vowelname9 or \
-                                wordname[j2 + 3] == vowelname10 or \
-                                wordname[j2 + 3] == vowelname11 or \
-                                wordname[j2 + 3] == vowelname12 or \
-                                wordname[j2 + 3] == vowelname15 or \
-                                wordname[j2 + 2] == vowelname1b or \
-                                wordname[j2 + 3] == vowelname0a:
-                                # note: vowelname1b has been swapped earlier; it is at j2+2
-                                # now shift reph sign to correct location
-                                wordname[j2] = wordname[j2 + 2]
-                                wordname[j2 + 1] = wordname[j2 + 3]
-                                wordname[j2 + 2] = rephlookupList[0][2]
-                                del wordname[j2 + 3]
-                                #del wordname[j2 + 3]
-                                rephreplace = rephreplace + 1
-                            # look other type of vowel after consonant that attaches at bottom
-                            elif wordname[j2 + 3] == vowelname1 or \
-                                wordname[j2 + 3] == vowelname2 or \
-                                wordname[j2 + 3] == vowelname3 or \
-                                wordname[j2 + 3] == vowelname4 or \
-                                wordname[j2 + 3] == vowelname5 or \
-                                wordname[j2 + 3] == vowelname6 or \
-                                wordname[j2 + 3] == vowelname7 or \
-                                wordname[j2 + 3] == vowelname8 or \
-                                wordname[j2 + 3] == vowelname13:
-
-                                # move reph sign to correct location
-                                del wordname[j2]
-                                del wordname[j2]
-                                wordname[j2 + 2] = rephlookupList[0][2]
-                                rephreplace = rephreplace + 2
-
-                            else:
-                                # a simple consonant after reph
-                                wordname[j2] = wordname[j2 + 2]
-                                wordname[j2 + 1] = rephlookupList[0][2]
-                                del wordname[j2 + 2]
-                                rephreplace = rephreplace + 1
-                            #print("after reph =", wordname)
-
-        wordnamelen = len(wordname)
-        # now the main loop for type 4 and type 6 substitutions
-        for ij in range(0, len(wordname)):
-            nextpos = 0
-            replace = 0
-            charpos = 0
-            substdone = False  # subst not done yet
-
-            for i2 in range(nextpos, wordnamelen):
-                charpos = i2 - replace  # current char position in word
-
-                # now do type 5 substitution
-                for i3 in range(0, len(subst5List)):  # skip last subst char in word
-                    if not lookuptype5:
-                        continue  # skip type 5
-                    if wordname[charpos] == subst5List[i3][1]:
-                        rulenumber2 = "0"
-                        classnumber2 = "0"
-                        for i4 in range(0, len(subst5DefList)):
-                            if wordname[charpos] == subst5DefList[i4][1] and subst5List[i3][0] == subst5DefList[i4][0]:
-
-                                wordclass = subst5DefList[i4][2]
-                                tablenumber = subst5DefList[i4][0]
-                                # print("we are in classdef table stage 1 now",  tablenumber, wordclass,
-                                #       wordname[charpos], wordname[charpos+1])
-
-                                # now get the type 5 rule lookup rule
-                                for i5 in range(0, len(subst5RuleList)):
-                                    if tablenumber == subst5RuleList[i5][0] and wordclass == subst5RuleList[i5][1]:
-                                        lookupnumber2 = subst5RuleList[i5][4]
-                                        tablenumber2 = subst5RuleList[i5][0]
-                                        classnumber2 = subst5RuleList[i5][1]
-                                        rulenumber2 = subst5RuleList[i5][2]
-                                        nextclassnumber2 = subst5RuleList[i5][3]
-
-                                        if lookupnumber2 == "0":
-                                            continue
-                                        # print("we are in classdef table stage 2 now", tablenumber, wordclass,
-                                        #       wordname[charpos], wordname[charpos + 1], lookupnumber2, tablenumber2,
-                                        #       classnumber2, rulenumber2)
-                                        for i6 in range(0, len(subst5lookup1List)):
-                                            #print("stage 3 =", wordclass, classnumber2, nextclassnumber2, subst5RuleList[i5][4])
-                                            if wordname[charpos + 1] == subst5lookup1List[i6][2] and lookupnumber2 == \
-                                                    subst5lookup1List[i6][1] \
-                                                    and tablenumber2 == subst5lookup1List[i6][0] \
-                                                    and rulenumber2 == subst5lookup1List[i6][5] \
-                                                    and classnumber2 == subst5lookup1List[i6][4]:
-                                                # print("type 5 susbt before doing", ij, charpos, word, wordname,
-                                                #       tablenumber2, lookupnumber2,
-                                                #       wordname[charpos], wordname[charpos + 1])
-                                                wordname[charpos+1] = subst5lookup1List[i6][3]
-                                                replace = 0
-                                                # print("type 5 susbt after done", word, wordname, tablenumber,
-                                                #       lookupnumber2,
-                                                #       wordname[charpos], wordname[charpos + 1])
-                                                continue
-
-                        #break  # do only for first in subst5list table? not sure here!
-
-                # the loop for type 4 subst with 3, 2 or 1 components
-
-                # now do type 4 substitution
-                for i3 in range(0, len(substList)):
-                    if not lookuptype4:
-                        continue  # skip type 4
-                    if wordname[charpos] == substList[i3][0]:  # current char is in subst list
-                        substword = wordname[charpos]
-                        substComponent = substList[i3][1]
-                        substValue = substList[i3][2]
-
-                        if len(substComponent) == 3:  # first do triple chars subst
-                            if wordname[charpos + 1] == ZWNJName:
-                                if (substComponent[0] == wordname[charpos + 1]) and (
-                                        substComponent[2] == wordname[charpos + 3]):
-                                    # print("got to level 3 with zwj")
-                                    wordname[charpos] = substValue
-                                    del wordname[charpos + 1]  # delete that replaced char
-                                    del wordname[charpos + 1]
-                                    del wordname[charpos + 1]
-                                    wordnamelen = wordnamelen - 3
-                                    nextpos = charpos + 1  # we deleted one char, so nextpos is same
-                                    replace = replace + 3
-                                    substdone = True
-                                    if debug:
-                                        print("aft L3zwnj ij, charpos, nextpos, rep, len, new wordname", ij, charpos,
-                                              nextpos,
-                                              replace, wordnamelen, word[charpos],
-                                              word[charpos + 1], word[charpos + 2], substword, substComponent,
-                                              substValue)
-                                    continue  # break i3 loop
-
-                            else:  # if no ZWNJ, do these
-                                if (substComponent[0] == wordname[charpos + 1]) and (substComponent[1]
-                                                                                     == wordname[charpos + 2]) and (
-                                        substComponent[2] == wordname[charpos + 3]):
-                                    # print("got to level 3")
-                                    wordname[charpos] = substValue
-                                    del wordname[charpos + 1]  # delete that replaced char
-                                    del wordname[charpos + 1]
-                                    del wordname[charpos + 1]
-                                    wordnamelen = wordnamelen - 3
-                                    nextpos = charpos + 1  # we deleted these chars, so nextpos is +1
-                                    replace = replace + 3
-                                    substdone = True
-                                    if debug:
-                                        print("aft L3 ij, charpos, nextpos, rep, len, new wordname", ij, charpos,
-                                              nextpos, replace, wordnamelen, word[charpos],
-                                              word[charpos + 1], word[charpos + 2], substword, substComponent,
-                                              substValue)
-                                    continue  # break i3 loop
-
-                        elif len(substComponent) == 2:  # do double chars subst
+                            # print("we are in classdef table stage 2 now", tablenumber, wordclass,
+                            #       wordname[charpos], wordname[charpos + 1], lookupnumber2, rulenumber2)
+                            nextglyph = wordname[charpos + 1]
+                            for subst1in, subst1out in subst5SubstMap.get((tablenumber, lookupnumber2, wordclass,
+                                                                           rulenumber2), ()):
+                                if nextglyph == subst1in:
+                                    # print("type 5 susbt before doing", ij, charpos, word, wordname,
+                                    #       tablenumber, lookupnumber2,
+                                    #       wordname[charpos], wordname[charpos + 1])
+                                    nextglyph = wordname[charpos + 1] = subst1out
+                                    replace = 0
+
+                    #break  # do only for first in subst5list table? not sure here!
+
+            # the loop for type 4 subst with 3, 2 or 1 components
+
+            # now do type 4 substitution
+            # probe the ligature tables with the glyphs at charpos and take the first
+            # matching entry in table order; after a substitution only the entries
+            # past it are tried, just as the scan over substList below does.
+            # Close to the ends of the word, finish with that scan instead
+            lastsubst = -1
+            if lookuptype4:
+                while True:
+                    if charpos < -len(wordname) or charpos + 3 >= len(wordname):
+                        break  # scan the rest of substList below
+                    substword = wordname[charpos]
+                    nextglyph1 = wordname[charpos + 1]
+                    nextglyph2 = wordname[charpos + 2]
+                    nextglyph3 = wordname[charpos + 3]
+                    # walk the trie along the next glyphs, collecting the entries of each length
+                    candidates = []
+                    node = ligatureTrie.get(substword)
+                    if node is not None:
+                        node = node[1].get(nextglyph1)
+                    if node is not None:
+                        candidates.append(node[0])
+                        node = node[1].get(nextglyph2)
+                        if node is not None:
+                            candidates.append(node[0])
+                            if nextglyph1 != ZWNJID:
+                                node = node[1].get(nextglyph3)
+                                if node is not None:
+                                    candidates.append(node[0])
+                    if nextglyph1 == ZWNJID:
+                        candidates.append(zwnjLigatureMap.get((substword, nextglyph1, nextglyph3), []))
+                    i3 = len(substList)
+                    for matches in candidates:
+                        nextmatch = bisect_right(matches, lastsubst)
+                        if nextmatch < len(matches) and matches[nextmatch] < i3:
+                            i3 = matches[nextmatch]
+                    lastsubst = i3
+                    if i3 == len(substList):
+                        break  # no more substitutions at charpos
+
+                    substComponent = substList[i3][1]
+                    substValue = substList[i3][2]
+                    wordname[charpos] = substValue
+                    delglyphs(wordname, charpos + 1, len(substComponent))  # delete the replaced chars
+                    wordnamelen = wordnamelen - len(substComponent)
+                    nextpos = charpos + 1  # we deleted these chars, so nextpos is +1
+                    replace = replace + len(substComponent)
+                    substdone = True
+                    if debug:
+                        print("aft L" + str(len(substComponent)) + " ij, charpos, nextpos, rep, len, new wordname",
+                              ij, charpos, nextpos, replace, wordnamelen, substword, substComponent, substValue)
+
+            i3 = lastsubst
+            # entries for the current char, in table order; after a substitution
+            # the rest of them are tried on the new char
+            if lookuptype4:
+                while i3 + 1 < len(substList):
+                    i3 = nextentry(substIndex, wordname[charpos], i3)
+                    if i3 is None:
+                        break
+                    substword = wordname[charpos]
+                    substComponent = substList[i3][1]
+                    substValue = substList[i3][2]
+
+                    if len(substComponent) == 3:  # first do triple chars subst
+                        if wordname[charpos + 1] == ZWNJID:
                             if (substComponent[0] == wordname[charpos + 1]) and (
-                                    substComponent[1] == wordname[charpos + 2]):
-                                # print("got to level 2")
+                                    substComponent[2] == wordname[charpos + 3]):
+                                # print("got to level 3 with zwj")
                                 wordname[charpos] = substValue
-                                del wordname[charpos + 1]  # delete that replaced char
-                                del wordname[charpos + 1]
-                                wordnamelen = wordnamelen - 2
-                                nextpos = charpos + 1  # we deleted two char, so nextpos is +1
-                                replace = replace + 2
+                                delglyphs(wordname, charpos + 1, 3)  # delete the replaced chars
+                                wordnamelen = wordnamelen - 3
+                                nextpos = charpos + 1  # we deleted one char, so nextpos is same
+                                replace = replace + 3
                                 substdone = True
                                 if debug:
-                                    print("aft L2 ij, charpos, nextpos, rep, len, new wordname", ij, charpos, nextpos,
+                                    print("aft L3zwnj ij, charpos, nextpos, rep, len, new wordname", ij, charpos,
+                                          nextpos,
                                           replace, wordnamelen, word[charpos],
-                                          word[charpos + 1], word[charpos + 2], substword, substComponent, substValue)
-                                continue  # break i3 loop
-
-                        elif len(substComponent) == 1:  # do single char subst
-                            if substComponent[0] == wordname[charpos + 1]:
-                                # print("got to level 1")
+                                          word[charpos + 1], word[charpos + 2], substword, substComponent,
+                                          substValue)
+
+                        else:  # if no ZWNJ, do these
+                            if (substComponent[0] == wordname[charpos + 1]) and (substComponent[1]
+                                                                                 == wordname[charpos + 2]) and (
+                                    substComponent[2] == wordname[charpos + 3]):
+                                # print("got to level 3")
                                 wordname[charpos] = substValue
-                                del wordname[charpos + 1]  # delete that replaced char
-                                wordnamelen = wordnamelen - 1
-                                nextpos = charpos + 1  # we deleted one char, so nextpos is +1
-                                replace = replace + 1
+                                delglyphs(wordname, charpos + 1, 3)  # delete the replaced chars
+                                wordnamelen = wordnamelen - 3
+                                nextpos = charpos + 1  # we deleted these chars, so nextpos is +1
+                                replace = replace + 3
                                 substdone = True
                                 if debug:
-                                    print("aft L1 ij, charpos, nextpos, rep, len, new wordname", ij, charpos, nextpos,
-                                          replace, wordnamelen, word[charpos],
-                                          word[charpos + 1], substword, substComponent, substValue)
-                                continue  # break i3 loop
-
-                # type 6 LA substitution
-                # now do type 6 substitution
-                for i3 in range(0, len(subst6List)):
-                    if not lookuptype6:
-                        continue  # skip type 6
-                    # print("subst6 ", wordname[charpos], subst6List[i3][0][0])
-                    for i4 in range(0, len(subst6List[i3][3])):
-                        if wordname[charpos] == subst6List[i3][3][i4]:  # current char is in type 6 subst list
-                            # print("before subst6 ", len(subst6List[i3][4]), wordname[charpos], subst6List[i3][3][0])
-                            if subst6List[i3][0] == '0' and subst6List[i3][1] == '0': # only one char
-                                #print("before subst6 ", len(subst6List[i3][4]), wordname[charpos], subst6List[i3][3][0])
-                                for j3 in range(0, len(subst6List[i3][4])):
-                                    if wordname[charpos + 1] == subst6List[i3][4][j3]:  # see if next word char is in list
-                                        if debug:
-                                            print("after subst6 0 0 ", (subst6List[i3][4][j3]), wordname[charpos + 1],
-                                                  subst6List[i3][5])
-                                        for k3 in range(0, len(subst1List)):
-                                            if subst6List[i3][5] == subst1List[k3][0]:
-                                                if debug:
-                                                    print("final before LA 0 0", wordname[charpos], subst1List[k3][0],
-                                                          subst1List[k3][2])
-                                                wordname[charpos] = subst1List[k3][2]  # read subst char name from list 1
-                                                if debug:
-                                                    print("final after LA 0 0", wordname[charpos], subst1List[k3][0],
-                                                          subst1List[k3][2])
-                                                    print("final LA 0 0", word, wordname)
-
-                                                substdone = True
-                                                continue
-
-                            if subst6List[i3][0] == '1' and subst6List[i3][1] == '0':  # two consecutive chars and one char subst
-                                # print("2 seq. before subst6 ", len(subst6List[i3][4]), wordname[charpos],
-                                #       subst6List[i3][3][0])
-                                if wordname[charpos + 1] == subst6List[i3][3][1]:  # two chars seq. found
-                                    # print("2 seq. before subst6 ", len(subst6List[i3][4]), wordname[charpos],
-                                    #       subst6List[i3][3][0])
-                                    for j3 in range(0, len(subst6List[i3][4])):
-                                        if wordname[charpos + 2] == subst6List[i3][4][j3]:  # third word char is in list 6
-                                            if debug:
-                                                print("after subst6 1 0 ", (subst6List[i3][4][j3]),
-                                                       wordname[charpos + 1], subst6List[i3][5])
-                                            for k3 in range(0, len(subst1List)):
-                                                if subst6List[i3][5] == subst1List[k3][0]:
-                                                    if debug:
-                                                        print("final LA 1 0 before", wordname[charpos], subst1List[k3][0],
-                                                              subst1List[k3][2])
-                                                    wordname[charpos] = subst1List[k3][2]  # now subst ar char postion
-                                                    if debug:
-                                                        print("final LA 1 0 after", wordname[charpos], subst1List[k3][0],
-                                                              subst1List[k3][2])
-                                                        print("final LA 1 0", word, wordname)
-
-                                                    substdone = True
-                                                    continue
-
-                #type 6 BT substitution
-                for i3 in range(0, len(subst6BTList)):
-                    if not lookuptype6:
-                        continue  # skip type 6
-                    # print("subst6 ", wordname[charpos], subst6List[i3][0][0])
-                    for i4 in range(0, len(subst6BTList[i3][3])):
-                        if wordname[charpos] == subst6BTList[i3][3][i4]:  # current word char in BT list
-                            # print("before subst6 ", len(subst6List[i3][4]), wordname[charpos], subst6List[i3][3][0])
-                            if subst6BTList[i3][0] == '0' and subst6BTList[i3][1] == '0':
-                                # print("before subst6 ", len(subst6List[i3][4]), wordname[charpos], subst6List[i3][3][0])
-                                for j3 in range(0, len(subst6BTList[i3][4])):
-                                    if wordname[charpos - 1] == subst6BTList[i3][4][j3]:  # check if previous char is BT list
-                                        if debug:
-                                            print("after subst6BT 0 0 ", (subst6BTList[i3][4][j3]),
-                                                  wordname[charpos - 1], subst6BTList[i3][5])
-                                        for k3 in range(0, len(subst1BTList)):
-                                            if subst6BTList[i3][5] == subst1BTList[k3][0]:
-                                                if debug:
-                                                    print("final BT  0 0 before", wordname[charpos], subst1BTList[k3][0],
-                                                          subst1BTList[k3][2])
-                                                wordname[charpos] = subst1BTList[k3][2]
-                                                if debug:
-                                                    print("final BT 0 0 after", wordname[charpos], subst1BTList[k3][0],
-                                                          subst1BTList[k3][2])
-                                                    print("final BT 0 0", word, wordname)
-
-                                                substdone = True
-                                                continue
-
-                            if subst6BTList[i3][0] == '1' and subst6BTList[i3][1] == '0':  # two char sequence
-                                # print("2 seq. before subst6BT ", len(subst6BTList[i3][4]), wordname[charpos],
-                                #       subst6BTList[i3][3][0])
-                                if wordname[charpos - 1] == subst6BTList[i3][3][1]:  # prev. char in two chars seq.
-                                    # print("2 seq. before subst6BT ", len(subst6BTList[i3][4]),
-                                    #       wordname[charpos], subst6BTList[i3][3][0])
-                                    for j3 in range(0, len(subst6BTList[i3][4])):
-                                        if wordname[charpos - 2] == subst6BTList[i3][4][j3]: # check prev. to prev. char
-                                            if debug:
-                                                print("after subst6 1 0 ", (subst6BTList[i3][4][j3]),
-                                                      wordname[charpos - 2], subst6BTList[i3][5])
-                                            for k3 in range(0, len(subst1BTList)):
-                                                if subst6BTList[i3][5] == subst1BTList[k3][0]:
-                                                    if debug:
-                                                        print("final BT 1 0 before", wordname[charpos],
-                                                              subst1BTList[k3][0], subst1BTList[k3][2])
-                                                    wordname[charpos] = subst1BTList[k3][2]
-                                                    if debug:
-                                                        print("final BT 1 0 after", wordname[charpos],
-                                                              subst1BTList[k3][0], subst1BTList[k3][2])
-                                                        print("final BT 1 0", word, wordname)
-
-                                                    substdone = True
-                                                    continue
+                                    print("aft L3 ij, charpos, nextpos, rep, len, new wordname", ij, charpos,
+                                          nextpos, replace, wordnamelen, word[charpos],
+                                          word[charpos + 1], word[charpos + 2], substword, substComponent,
+                                          substValue)
+
+                    elif len(substComponent) == 2:  # do double chars subst
+                        if (substComponent[0] == wordname[charpos + 1]) and (
+                                substComponent[1] == wordname[charpos + 2]):
+                            # print("got to level 2")
+                            wordname[charpos] = substValue
+                            delglyphs(wordname, charpos + 1, 2)  # delete the replaced chars
+                            wordnamelen = wordnamelen - 2
+                            nextpos = charpos + 1  # we deleted two char, so nextpos is +1
+                            replace = replace + 2
+                            substdone = True
+                            if debug:
+                                print("aft L2 ij, charpos, nextpos, rep, len, new wordname", ij, charpos, nextpos,
+                                      replace, wordnamelen, word[charpos],
+                                      word[charpos + 1], word[charpos + 2], substword, substComponent, substValue)
+
+                    elif len(substComponent) == 1:  # do single char subst
+                        if substComponent[0] == wordname[charpos + 1]:
+                            # print("got to level 1")
+                            wordname[charpos] = substValue
+                            del wordname[charpos + 1]  # delete that replaced char
+                            wordnamelen = wordnamelen - 1
+                            nextpos = charpos + 1  # we deleted one char, so nextpos is +1
+                            replace = replace + 1
+                            substdone = True
+                            if debug:
+                                print("aft L1 ij, charpos, nextpos, rep, len, new wordname", ij, charpos, nextpos,
+                                      replace, wordnamelen, word[charpos],
+                                      word[charpos + 1], substword, substComponent, substValue)
+
+            # type 6 LA substitution
+            if lookuptype6:
+                # None stands for a char past the end of the word, see subst6lookahead()
+                nextglyph2 = wordname[charpos + 2] if charpos + 2 < len(wordname) else None
+                glyph, done = subst6lookahead(wordname[charpos], wordname[charpos + 1], nextglyph2)
+                if done:
+                    wordname[charpos] = glyph
+                    substdone = True
+
+            #type 6 BT substitution
+            if not lookuptype6 or wordname[charpos] not in subst6BTGlyphs:
+                continue  # the current char starts no BT entry, go to the next char
+            # None stands for a char before the start of the word
+            prevglyph2 = wordname[charpos - 2] if charpos - 2 >= -len(wordname) else None
+            glyph, done = subst6backtrack(wordname[charpos], wordname[charpos - 1], prevglyph2)
+            if done:
+                wordname[charpos] = glyph
+                substdone = True
 
 
-            if debug:
-                print("iter no. ij, no. of substs., final wordname =", ij, replace, wordname)
-            # if (charpos+replace) > wordnamelen-1:  # recheck logic here!
-            #     break
+        if debug:
+            print("iter no. ij, no. of substs., final wordname =", ij, replace, wordname)
+        # if (charpos+replace) > wordnamelen-1:  # recheck logic here!
+        #     break
 
-            if not substdone:
-                   break  # break ij loop if no more subst required
+        if not substdone:
+               break  # break ij loop if no more subst required
 
 
-        for j3 in range(0, len(wordname)):
-            # now do char append
-            if wordname[j3] == None:
-                charAppend = ""
-                continue
-            elif wordname[j3] == 'LFName':
-                charAppend = "\n"
-            elif wordname[j3] == 'CRName':
-                charAppend = "\r"
-            elif wordname[j3] == 'ZWNJName':
-                charAppend = ""
-            elif wordname[j3] == 'ZWJName':
-                charAppend = ""
-            elif wordname[j3] == 'SpaceName':
-                charAppend = " "
-            elif wordname[j3] == 'LineBreak':
-                charAppend = "u+2028"
-            elif wordname[j3] == 'ParaSeparator':
-                charAppend = "u+2029"
-            else:
-                wordID = (font2.getGlyphID(wordname[j3]))
-                charAppend = "g+" + (hex(wordID)).replace("0x", "")
-
-            finalDisp = finalDisp + charAppend
+    # now do char append, one table lookup per glyph ID, joined once for the word
+    return "".join(map(glyphCodes.__getitem__, wordname))
+
+
+# a word is a run of chars up to and including the next space
+wordRE = re.compile(r"[^ ]+ ?| ")
+controlRE = re.compile("[\x00-\x1e]")  # chars below 31 only show as a new line in the 2nd window
+uniTexts = {}  # text in the 2nd window for each input char seen so far
+
+
+# the main routine to read copied data in the first window, do all the substitutions,
+# and display the final converted file in the third window! The second windows shows
+# unicode values of the input chars, useful for debugging.
+
+def retrieve_input():
+
+    global finalDisp  # global so can be used in routines
+    global uniDisp  # display unicode value in 2nd window for debugging
+
+    finalDisp = ""  # initialize final display string in third window!
+    uniDisp = ""  # initialize unicode display string 2nd window!
+
+    #   manipulate the unicode string and convert
+    inputValue = textBox.get("1.0", "end-1c")
+    #inputValue = inputValue  # pad extra 3 space for level 3
+
+    # unicode values of the input chars for the 2nd window, the last char is not shown;
+    # the text of each new char is added to uniTexts, then the chars are mapped through it
+    uniText = inputValue[:-1]
+    for char in set(uniText).difference(uniTexts):
+        code = ord(char)
+        uniTexts[char] = "\n" if code < 31 else hex(code) + ","
+    uniDisp = "".join(map(uniTexts.__getitem__, uniText))
+
+    # split input text into words for easier processing, each word keeps the space
+    # that ends it. One word is read per char that is not a control char, so the
+    # last word of a text with only spaces and control chars is left unread
+    words = wordRE.findall(inputValue)
+    del words[len(inputValue) - len(controlRE.findall(inputValue)):]
+
+    # the words do not depend on each other, so they are converted in one batch
+    finalDisp = "".join(map(convert_word, words))
+
     #quit()
     #print(finalDisp)
     print('conversion done')